@@ -12,34 +12,394 @@ python app_web.py
 Puis ouvrir : http://localhost:5000/systeme-prediction-restaurant
 """
 
-from flask import Flask, render_template_string, request, jsonify, redirect, url_for
+from flask import (Flask, render_template_string, request, jsonify, redirect, url_for, g,
+                   Response, stream_with_context)
+import hmac
 import joblib
+import json
 import pandas as pd
 import numpy as np
-from datetime import datetime
+import os
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+
+from calendrier import CalendrierIndex, lire_date
+from modele_compact import charger_foret_compacte, chemin_compact
+from metriques import Registre, ajouter_metriques_processus
+from profilage import ProfileurEchantillonnage, ProfilsAgreges
+from stockage import StockPrevisions, empreinte_fichiers, SITE_DEFAUT
+from compression_http import PageStatique, compresser_reponse
+from surveillance import Surveillance, Reentrainement
+from reconciliation import reconcilier
 
 app = Flask(__name__)
 app.config['APPLICATION_NAME'] = 'Système de Prédiction ML - Restaurant Universitaire'
+# Profilage : fraction des requêtes /api/predire profilées (modifiable à chaud)
+app.config['PROFILAGE_TAUX'] = float(os.environ.get('PROFILAGE_TAUX', 0))
+app.config['PROFILAGE_DOSSIER'] = os.environ.get('PROFILAGE_DOSSIER', 'profils')
+# Jeton exigé pour profiler une requête à la demande et pour changer le taux
+# (vide : profilage à la demande et réglage à chaud désactivés)
+app.config['PROFILAGE_JETON'] = os.environ.get('PROFILAGE_JETON', '')
+# Modèles compacts (model_*.npz, voir modele_compact.py) au lieu des .pkl
+app.config['MODELES_COMPACTS'] = os.environ.get('MODELES_COMPACTS') == '1'
+# Durée de mise en cache de la page web par les navigateurs (secondes)
+app.config['CACHE_PAGE_SECONDES'] = int(os.environ.get('CACHE_PAGE_SECONDES', 300))
+# Base SQLite des prévisions (chaîne vide pour désactiver)
+app.config['STOCK_PREVISIONS'] = os.environ.get('STOCK_PREVISIONS', 'previsions.db')
+# Interface web : préchargement des prévisions du mois affiché (0 pour désactiver)
+app.config['PRECHARGEMENT_UI'] = os.environ.get('PRECHARGEMENT_UI', '1') == '1'
+# Surveillance : réentraînement automatique quand les seuils sont dépassés
+app.config['REENTRAINEMENT_AUTO'] = os.environ.get('REENTRAINEMENT_AUTO') == '1'
+# Jeton exigé pour saisir la fréquentation réelle via l'API (elle sert de
+# données d'entraînement) ; vide : saisie uniquement par stockage.py importer
+app.config['INGESTION_JETON'] = os.environ.get('INGESTION_JETON', '')
+
+
+def fichier_modele(target):
+    # Seules les forêts ont une version compacte : les autres modèles restent
+    # en .pkl, comme ceux dont l'export ne correspond plus au .pkl actuel
+    if app.config['MODELES_COMPACTS']:
+        return chemin_compact(f'model_{target}.pkl') or f'model_{target}.pkl'
+    return f'model_{target}.pkl'
+
+
+def charger_modele(target):
+    if fichier_modele(target).endswith('.npz'):
+        return charger_foret_compacte(fichier_modele(target))
+    return joblib.load(fichier_modele(target))
+
 
 # Charger les modèles entraînés
 print("📂 Chargement des modèles...")
 try:
     models = {
-        'Petit_Dejeuner': joblib.load('model_Petit_Dejeuner.pkl'),
-        'Dejeuner': joblib.load('model_Dejeuner.pkl'),
-        'Diner': joblib.load('model_Diner.pkl')
+        'Petit_Dejeuner': charger_modele('Petit_Dejeuner'),
+        'Dejeuner': charger_modele('Dejeuner'),
+        'Diner': charger_modele('Diner')
     }
 
     with open('features_list.txt', 'r') as f:
         features = f.read().strip().split(',')
 
-    print("✅ Modèles chargés avec succès !")
+    # Modèle du Total, pour la réconciliation (absent des anciens entraînements)
+    modele_total = charger_modele('Total') if os.path.exists('model_Total.pkl') else None
+
+    # Version des modèles et du calendrier (dont dépendent les features) :
+    # les prévisions stockées lui sont rattachées
+    fichiers_version = [fichier_modele(t) for t in models] + ['features_list.txt']
+    if os.path.exists('calendrier_universitaire.csv'):
+        fichiers_version.append('calendrier_universitaire.csv')
+    version_modele = empreinte_fichiers(fichiers_version)
+    print(f"✅ Modèles chargés avec succès ! (version {version_modele})")
+
+    # Calendrier (weekends, jours fériés, vacances) précalculé une seule fois
+    calendrier = CalendrierIndex.charger('calendrier_universitaire.csv')
+    print(f"✅ Calendrier chargé : {len(calendrier)} jours indexés")
+
+    stock = None
+    if app.config['STOCK_PREVISIONS']:
+        stock = StockPrevisions(app.config['STOCK_PREVISIONS'])
+        print(f"✅ Base des prévisions : {app.config['STOCK_PREVISIONS']}")
 
 except FileNotFoundError:
     print("❌ ERREUR : Modèles non trouvés !")
     print("   Exécutez d'abord : python train_model.py")
+    if app.config['MODELES_COMPACTS']:
+        print("   puis : python modele_compact.py")
     exit()
 
+# Métriques exposées sur /metrics (format Prometheus)
+registre = Registre()
+requetes_total = registre.compteur(
+    'http_requetes_total', 'Nombre de requêtes HTTP traitées.', ('route', 'methode', 'code'))
+duree_requete = registre.histogramme(
+    'http_requete_duree_secondes', 'Durée totale des requêtes HTTP.', ('route',))
+duree_etape = registre.histogramme(
+    'prediction_etape_duree_secondes', 'Durée de chaque étape de /api/predire.', ('etape',))
+duree_modele = registre.histogramme(
+    'prediction_modele_duree_secondes', 'Durée de la prédiction de chaque modèle.', ('modele',))
+erreurs_total = registre.compteur(
+    'prediction_erreurs_total', 'Requêtes de prédiction en erreur, par type.', ('type',))
+lignes_total = registre.compteur(
+    'prediction_lignes_total', 'Nombre de jours prédits.')
+registre.jauge(
+    'cache_requetes_total', 'Consultations des caches, servies (succes) ou recalculées (echecs).',
+    lambda: [((cache, resultat), nombre)
+             for cache, source in (('calendrier', calendrier), ('previsions', stock))
+             if source is not None
+             for resultat, nombre in source.statistiques.items()],
+    labels=('cache', 'resultat'), type_metrique='counter')
+ajouter_metriques_processus(registre)
+
+# Surveillance de la précision et de la dérive, reprise depuis la base
+surveillance = Surveillance.charger(
+    'reference_surveillance.json',
+    # Le réentraînement a besoin de la fréquentation réelle stockée dans la base
+    reentrainement=(Reentrainement(app.config['STOCK_PREVISIONS'])
+                    if app.config['REENTRAINEMENT_AUTO'] and stock is not None else None)
+)
+
+
+def observer_frequentation(dates, reels, previsions, reentrainer=True):
+    """Transmet à la surveillance des jours observés, dans l'ordre des dates ;
+    sans ``reentrainer``, les alertes ne déclenchent pas de réentraînement."""
+    table = calendrier.features(dates)[features]
+    alertes = []
+    for date, ligne, reel, prevision in sorted(
+            zip(dates, table.to_dict('records'), reels, previsions), key=lambda t: t[0]):
+        alertes = surveillance.observer(date, ligne, reel, prevision, reentrainer=reentrainer)
+    return alertes
+
+
+if stock is not None:
+    historique = stock.comparer((datetime.now() - timedelta(days=365)).strftime('%Y-%m-%d'),
+                                datetime.now().strftime('%Y-%m-%d'), SITE_DEFAUT, version_modele)
+    if historique:
+        # Simple reprise de l'état : les jours déjà connus ne relancent pas d'entraînement
+        observer_frequentation([l['Date'] for l in historique], [l['reel'] for l in historique],
+                               [l['prevision'] for l in historique], reentrainer=False)
+        print(f"✅ Surveillance reprise sur {len(historique)} jours observés")
+
+registre.jauge(
+    'surveillance_mae_glissante', 'MAE des derniers jours observés, par repas.',
+    lambda: [((repas,), mae) for repas, mae in surveillance.etat()['mae_glissante'].items()
+             if mae is not None],
+    labels=('repas',))
+registre.jauge(
+    'surveillance_psi', 'Dérive (PSI) des distributions par rapport à l\'entraînement.',
+    lambda: [((variable,), psi) for variable, psi in surveillance.etat()['psi'].items()],
+    labels=('variable',))
+
+# Quantiles par défaut de l'intervalle de prédiction (intervalle à 90%)
+QUANTILES_DEFAUT = (0.05, 0.95)
+
+
+def valider_quantiles(quantiles):
+    """Vérifie que les quantiles forment un couple (bas, haut) dans [0, 1]."""
+    if len(quantiles) != 2:
+        raise ValueError("'quantiles' doit contenir exactement 2 valeurs (bas, haut)")
+    bas, haut = float(quantiles[0]), float(quantiles[1])
+    if not 0.0 <= bas < haut <= 1.0:
+        raise ValueError("'quantiles' doit vérifier 0 <= bas < haut <= 1")
+    return bas, haut
+
+
+def predictions_par_arbre(model, X):
+    """Prédictions de chaque arbre de la forêt : tableau (n_arbres, n_lignes).
+
+    La moyenne sur les arbres redonne exactement ``model.predict`` : un seul
+    passage suffit pour la valeur ponctuelle et l'intervalle. Pour un modèle
+    sans arbres (boosting, ridge), les lignes sont la prédiction décalée de
+    chacun de ses résidus de validation, centrés.
+    """
+    if hasattr(model, 'predict_arbres'):
+        return model.predict_arbres(X)
+    if hasattr(model, 'estimators_'):
+        # Entrée validée une seule fois, puis parcours direct de chaque arbre
+        # (arbre.predict revaliderait X pour chacun des arbres)
+        X_arbres = np.ascontiguousarray(X, dtype=np.float32)
+        return np.stack([arbre.tree_.predict(X_arbres)[:, 0] for arbre in model.estimators_])
+    if not hasattr(model, 'residus_validation_'):
+        raise ValueError("Intervalles indisponibles pour ce modèle (réentraînez-le)")
+    residus = model.residus_validation_ - model.residus_validation_.mean()
+    return model.predict(X)[None, :] + residus[:, None]
+
+
+# Nombre maximal de jours pour une requête sur une plage de dates
+MAX_JOURS_PLAGE = 1000
+# En flux NDJSON : jours calculés par bloc, et nombre maximal de jours
+TAILLE_BLOC_FLUX = 92
+MAX_JOURS_FLUX = 100 * 366
+
+
+def table_calendrier(data):
+    """Table calendaire de la requête : une date ou une plage de dates.
+
+    Toutes les features sont dérivées de la date ; 'weekend' et 'jour_ferie'
+    peuvent être forcés par le client (fermeture exceptionnelle, etc.).
+    """
+    if 'date_debut' in data:
+        table = calendrier.plage(data['date_debut'], data['date_fin'])
+        if len(table) > MAX_JOURS_PLAGE:
+            raise ValueError(f"Plage limitée à {MAX_JOURS_PLAGE} jours")
+    elif 'date' in data:
+        table = calendrier.features([data['date']])
+    else:
+        table = calendrier.features([datetime(data['annee'], data['mois'], data['jour'])])
+
+    if data.get('weekend') is not None:
+        table['Weekend'] = int(data['weekend'])
+    if data.get('jour_ferie') is not None:
+        table['Jour_Ferie'] = int(data['jour_ferie'])
+    return table
+
+
+def indicateurs_forces(data):
+    return data.get('weekend') is not None or data.get('jour_ferie') is not None
+
+
+def predire_table(table, data, quantiles=None):
+    """Prédictions des lignes de ``table``, lues à travers la base des
+    prévisions quand c'est possible.
+
+    La base n'est utilisée que pour les prévisions ponctuelles calculées à
+    partir du seul calendrier : avec des indicateurs forcés, des intervalles
+    ou la réconciliation, les modèles sont interrogés directement.
+    """
+    reconciliation = bool(data.get('reconciliation'))
+    if stock is None or quantiles is not None or reconciliation or indicateurs_forces(data):
+        return predire_lignes(table[features], quantiles, reconciliation)
+
+    dates = [jour.strftime('%Y-%m-%d') for jour in table.index]
+    return stock.lire_ou_calculer(
+        data.get('site', SITE_DEFAUT), version_modele, dates,
+        lambda positions: predire_lignes(table.iloc[positions][features])
+    )
+
+
+def predire_lignes(X, quantiles=None, reconciliation=False):
+    """Prédictions des trois repas et du Total pour chaque ligne de X.
+
+    Avec ``quantiles``, ajoute l'intervalle de prédiction de chaque repas ;
+    celui du Total est calculé sur la somme, arbre par arbre, des
+    prédictions des trois repas.
+
+    Avec ``reconciliation``, le modèle du Total est interrogé aussi et les
+    quatre prévisions du lot sont réconciliées (voir reconciliation.py) ;
+    les intervalles sont décalés d'autant.
+    """
+    modeles = models
+    if reconciliation:
+        if modele_total is None:
+            raise ValueError("Réconciliation indisponible : relancez train_model.py "
+                             "pour entraîner le modèle du Total")
+        modeles = {**models, 'Total': modele_total}
+
+    if quantiles is None:
+        valeurs = {}
+        for target, model in modeles.items():
+            with duree_modele.chronometrer(modele=target):
+                valeurs[target] = model.predict(X)
+    else:
+        par_arbre = {}
+        for target, model in modeles.items():
+            with duree_modele.chronometrer(modele=target):
+                par_arbre[target] = predictions_par_arbre(model, X)
+        valeurs = {target: arbres.mean(axis=0) for target, arbres in par_arbre.items()}
+        # Modèles de natures différentes : pas de tirages communs pour le Total
+        if not reconciliation and len({arbres.shape[0] for arbres in par_arbre.values()}) == 1:
+            par_arbre['Total'] = sum(par_arbre.values())
+
+    if reconciliation:
+        reconciliees = reconcilier(valeurs)
+        if quantiles is not None:
+            par_arbre = {target: arbres + (reconciliees[target] - valeurs[target])
+                         for target, arbres in par_arbre.items()}
+        valeurs = {target: reconciliees[target] for target in models}
+
+    colonnes = {target: np.maximum(0, v).astype(int) for target, v in valeurs.items()}
+    colonnes['Total'] = sum(colonnes.values())
+    lignes = [dict(zip(colonnes, map(int, ligne))) for ligne in zip(*colonnes.values())]
+
+    if quantiles is not None:
+        bornes = {target: np.quantile(arbres, quantiles, axis=0)
+                  for target, arbres in par_arbre.items()}
+        if 'Total' not in bornes:
+            # Somme des bornes des repas : intervalle du Total prudent
+            bornes['Total'] = sum(bornes.values())
+        for i, ligne in enumerate(lignes):
+            intervalles = {'quantiles': list(quantiles)}
+            for target, (bas, haut) in bornes.items():
+                intervalles[target] = {
+                    'bas': max(0, int(np.floor(bas[i]))),
+                    'haut': max(0, int(np.ceil(haut[i])))
+                }
+            ligne['Intervalles'] = intervalles
+    return lignes
+
+
+# Indicateurs forcés de chaque variante renvoyée avec "variantes": true
+VARIANTES = {
+    'weekend': {'Weekend': 1},
+    'jour_ferie': {'Jour_Ferie': 1},
+    'weekend_jour_ferie': {'Weekend': 1, 'Jour_Ferie': 1}
+}
+
+
+def predire_variantes(table, data, quantiles=None):
+    """Prédictions de chaque jour de ``table`` pour chaque variante des
+    indicateurs forcés : une liste ``[{variante: ligne}]``, calculée en un
+    seul appel des modèles pour toutes les variantes."""
+    X = table[features]
+    lignes = predire_lignes(pd.concat([X.assign(**forces) for forces in VARIANTES.values()]),
+                            quantiles, bool(data.get('reconciliation')))
+    n = len(X)
+    return [{nom: lignes[k * n + i] for k, nom in enumerate(VARIANTES)} for i in range(n)]
+
+
+def lignes_plage(table, lignes, variantes=None):
+    """Une entrée par jour pour les réponses sur une plage de dates."""
+    previsions = [{'Date': info['date'], 'Calendrier': info, **ligne}
+                  for info, ligne in zip(infos_calendrier(table), lignes)]
+    if variantes is not None:
+        for prevision, variantes_jour in zip(previsions, variantes):
+            prevision['Variantes'] = variantes_jour
+    return previsions
+
+
+def flux_previsions(data, quantiles):
+    """Réponse NDJSON (un objet JSON par ligne et par jour) pour une plage.
+
+    Les jours sont calendarisés et prédits bloc par bloc, au fil de
+    l'envoi : la mémoire reste constante quelle que soit la longueur de la
+    plage et le client reçoit les premiers jours immédiatement.
+    """
+    debut, fin = lire_date(data['date_debut']), lire_date(data['date_fin'])
+    if fin < debut:
+        raise ValueError("La date de fin doit être postérieure à la date de début")
+    if (fin - debut).days + 1 > MAX_JOURS_FLUX:
+        raise ValueError(f"Plage limitée à {MAX_JOURS_FLUX} jours")
+
+    def generer():
+        bloc_debut = debut
+        while bloc_debut <= fin:
+            bloc_fin = min(fin, bloc_debut + timedelta(days=TAILLE_BLOC_FLUX - 1))
+            try:
+                table = table_calendrier({**data, 'date_debut': bloc_debut, 'date_fin': bloc_fin})
+                lignes = predire_table(table, data, quantiles)
+                variantes = predire_variantes(table, data, quantiles) if data.get('variantes') else None
+            except Exception as e:
+                # L'en-tête 200 est déjà parti : l'erreur est signalée dans le flux
+                erreurs_total.inc(type=type(e).__name__)
+                yield json.dumps({'error': str(e)}, ensure_ascii=False) + '\n'
+                return
+            lignes_total.inc(len(lignes))
+            yield ''.join(json.dumps(ligne, ensure_ascii=False) + '\n'
+                          for ligne in lignes_plage(table, lignes, variantes))
+            bloc_debut = bloc_fin + timedelta(days=1)
+
+    return Response(stream_with_context(generer()), mimetype='application/x-ndjson')
+
+
+def flux_demande(data):
+    return data.get('format') == 'ndjson' or \
+        request.accept_mimetypes.best == 'application/x-ndjson'
+
+
+def infos_calendrier(table):
+    """Informations calendaires renvoyées au client pour chaque ligne."""
+    return [{
+        'date': jour.strftime('%Y-%m-%d'),
+        'jour_semaine': int(ligne.Jour_Semaine),
+        'weekend': int(ligne.Weekend),
+        'jour_ferie': int(ligne.Jour_Ferie),
+        'vacances': int(ligne.Vacances),
+        'libelle': ligne.Libelle
+    } for jour, ligne in zip(table.index, table.itertuples(index=False))]
+
+
 # Template HTML complet
 HTML_TEMPLATE = """
 <!DOCTYPE html>
@@ -153,6 +513,12 @@ HTML_TEMPLATE = """
             gap: 15px;
         }
 
+        .form-hint {
+            font-size: 0.85em;
+            color: #888;
+            margin-top: 5px;
+        }
+
         .checkbox-group {
             display: grid;
             grid-template-columns: 1fr 1fr;
@@ -404,19 +770,6 @@ HTML_TEMPLATE = """
                 <h2 class="card-title">Faire une Prédiction</h2>
 
                 <form id="predictionForm">
-                    <div class="form-group">
-                        <label for="dayOfWeek">Jour de la semaine</label>
-                        <select id="dayOfWeek" name="dayOfWeek" required>
-                            <option value="1">Lundi</option>
-                            <option value="2">Mardi</option>
-                            <option value="3">Mercredi</option>
-                            <option value="4">Jeudi</option>
-                            <option value="5">Vendredi</option>
-                            <option value="6">Samedi</option>
-                            <option value="7">Dimanche</option>
-                        </select>
-                    </div>
-
                     <div class="form-row">
                         <div class="form-group">
                             <label for="day">Jour</label>
@@ -447,6 +800,11 @@ HTML_TEMPLATE = """
                         </div>
                     </div>
 
+                    <p class="form-hint">
+                        Jour de la semaine, weekend, jours fériés et vacances sont déduits de la date.
+                        Cochez une case uniquement pour forcer l'indicateur.
+                    </p>
+
                     <div class="checkbox-group">
                         <div class="checkbox-item">
                             <input type="checkbox" id="weekend" name="weekend">
@@ -525,63 +883,177 @@ HTML_TEMPLATE = """
         const form = document.getElementById('predictionForm');
         const resultsDiv = document.getElementById('results');
 
-        const jours = ['', 'Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche'];
+        const jours = ['', 'Dimanche', 'Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi'];
         const mois = ['', 'Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin', 
                      'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre'];
 
-        form.addEventListener('submit', async (e) => {
-            e.preventDefault();
+        // Préchargement : prévisions du mois affiché (avec les variantes des
+        // indicateurs forcés) chargées en une requête et gardées en mémoire
+        const PRECHARGEMENT = {{ 'true' if prechargement else 'false' }};
+        const previsionsJour = new Map();
+        const moisCharges = new Map();
 
+        function lireFormulaire() {
             const formData = new FormData(form);
-            const data = {
-                jour_semaine: parseInt(formData.get('dayOfWeek')),
+            return {
                 jour: parseInt(formData.get('day')),
                 mois: parseInt(formData.get('month')),
                 annee: parseInt(formData.get('year')),
-                weekend: formData.get('weekend') ? 1 : 0,
-                jour_ferie: formData.get('holiday') ? 1 : 0
+                weekend: Boolean(formData.get('weekend')),
+                jour_ferie: Boolean(formData.get('holiday'))
             };
+        }
 
-            try {
-                const response = await fetch('/api/predire', {
-                    method: 'POST',
-                    headers: {
-                        'Content-Type': 'application/json'
-                    },
-                    body: JSON.stringify(data)
+        const deuxChiffres = (n) => String(n).padStart(2, '0');
+
+        async function envoyer(data) {
+            const response = await fetch('/api/predire', {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json'
+                },
+                body: JSON.stringify(data)
+            });
+            const result = await response.json();
+            if (result.error) {
+                throw new Error(result.error);
+            }
+            return result;
+        }
+
+        function chargerMois(annee, numeroMois) {
+            const cle = `${annee}-${deuxChiffres(numeroMois)}`;
+            if (!moisCharges.has(cle)) {
+                const dernierJour = new Date(annee, numeroMois, 0).getDate();
+                const chargement = envoyer({
+                    date_debut: `${cle}-01`,
+                    date_fin: `${cle}-${deuxChiffres(dernierJour)}`,
+                    intervalles: true,
+                    variantes: true
+                }).then((result) => {
+                    result.previsions.forEach((p) => previsionsJour.set(p.Date, p));
+                }).catch((error) => {
+                    moisCharges.delete(cle);
+                    throw error;
                 });
+                moisCharges.set(cle, chargement);
+            }
+            return moisCharges.get(cle);
+        }
 
-                const result = await response.json();
+        function depuisCache(saisie) {
+            const jourPrevu = previsionsJour.get(
+                `${saisie.annee}-${deuxChiffres(saisie.mois)}-${deuxChiffres(saisie.jour)}`);
+            if (!jourPrevu) {
+                return null;
+            }
+            let ligne = jourPrevu;
+            if (saisie.weekend && saisie.jour_ferie) {
+                ligne = jourPrevu.Variantes.weekend_jour_ferie;
+            } else if (saisie.weekend) {
+                ligne = jourPrevu.Variantes.weekend;
+            } else if (saisie.jour_ferie) {
+                ligne = jourPrevu.Variantes.jour_ferie;
+            }
+            const calendrier = { ...jourPrevu.Calendrier };
+            if (saisie.weekend) calendrier.weekend = 1;
+            if (saisie.jour_ferie) calendrier.jour_ferie = 1;
+            return { ...ligne, Calendrier: calendrier };
+        }
 
-                if (result.error) {
-                    alert('Erreur : ' + result.error);
-                    return;
+        async function predireJour(saisie) {
+            if (PRECHARGEMENT) {
+                try {
+                    await chargerMois(saisie.annee, saisie.mois);
+                } catch (error) {
+                    console.error(error);
+                }
+                const result = depuisCache(saisie);
+                if (result) {
+                    return result;
                 }
+            }
+
+            // Date hors du mois chargé : requête pour ce seul jour
+            const data = {
+                jour: saisie.jour,
+                mois: saisie.mois,
+                annee: saisie.annee,
+                intervalles: true
+            };
+            if (saisie.weekend) {
+                data.weekend = 1;
+            }
+            if (saisie.jour_ferie) {
+                data.jour_ferie = 1;
+            }
+            return envoyer(data);
+        }
 
-                displayResults(result, data);
+        let derniereDemande = 0;
 
+        async function afficherPrediction(defiler) {
+            const saisie = lireFormulaire();
+            const demande = ++derniereDemande;
+            try {
+                const result = await predireJour(saisie);
+                // Une saisie plus récente a pu être affichée entre-temps
+                if (demande === derniereDemande) {
+                    displayResults(result, saisie, defiler);
+                }
             } catch (error) {
-                alert('Erreur de connexion au serveur');
+                alert('Erreur : ' + error.message);
                 console.error(error);
             }
+        }
+
+        form.addEventListener('submit', (e) => {
+            e.preventDefault();
+            afficherPrediction(true);
+        });
+
+        // Résultats déjà affichés : mis à jour à chaque modification, depuis
+        // le cache quand le jour y est
+        form.addEventListener('change', () => {
+            if (!form.checkValidity()) {
+                return;
+            }
+            if (resultsDiv.classList.contains('show')) {
+                afficherPrediction(false);
+            } else if (PRECHARGEMENT) {
+                const saisie = lireFormulaire();
+                chargerMois(saisie.annee, saisie.mois).catch(console.error);
+            }
         });
 
-        function displayResults(result, inputData) {
-            const dateStr = `${jours[inputData.jour_semaine]} ${inputData.jour} ${mois[inputData.mois]} ${inputData.annee}`;
+        if (PRECHARGEMENT) {
+            const saisie = lireFormulaire();
+            chargerMois(saisie.annee, saisie.mois).catch(console.error);
+        }
+
+        function displayResults(result, inputData, defiler = true) {
+            const cal = result.Calendrier;
+            const dateStr = `${jours[cal.jour_semaine]} ${inputData.jour} ${mois[inputData.mois]} ${inputData.annee}`;
             document.getElementById('dateDisplay').textContent = dateStr;
 
             const badgesDiv = document.getElementById('badges');
             badgesDiv.innerHTML = '';
 
-            if (inputData.weekend) {
+            if (cal.weekend) {
                 badgesDiv.innerHTML += '<span class="badge">🏖️ Weekend</span>';
             }
-            if (inputData.jour_ferie) {
+            if (cal.jour_ferie) {
                 badgesDiv.innerHTML += '<span class="badge">🎉 Jour férié</span>';
             }
-            if (!inputData.weekend && !inputData.jour_ferie) {
+            if (cal.vacances) {
+                badgesDiv.innerHTML += '<span class="badge">🎒 Vacances</span>';
+            }
+            if (!cal.weekend && !cal.jour_ferie && !cal.vacances) {
                 badgesDiv.innerHTML += '<span class="badge">📚 Semaine</span>';
             }
+            if (cal.libelle) {
+                badgesDiv.innerHTML += `<span class="badge">${cal.libelle}</span>`;
+            }
 
             document.getElementById('totalNumber').textContent = result.Total;
             document.getElementById('breakfastNumber').textContent = result.Petit_Dejeuner;
@@ -589,11 +1061,23 @@ HTML_TEMPLATE = """
             document.getElementById('dinnerNumber').textContent = result.Diner;
 
             const total = result.Total;
-            const recommandations = [
-                `Préparer <strong>${Math.ceil(total * 1.1)}</strong> repas (marge de sécurité 10%)`,
-                `Stock minimum recommandé : <strong>${Math.ceil(total * 0.9)}</strong> repas`,
-                `Stock optimal : <strong>${Math.ceil(total * 1.05)}</strong> repas (marge 5%)`
-            ];
+            let recommandations;
+            if (result.Intervalles) {
+                const intervalle = result.Intervalles.Total;
+                const [qBas, qHaut] = result.Intervalles.quantiles;
+                const niveau = Math.round((qHaut - qBas) * 100);
+                recommandations = [
+                    `Préparer <strong>${intervalle.haut}</strong> repas (borne haute de l'intervalle ${niveau}%)`,
+                    `Stock minimum recommandé : <strong>${intervalle.bas}</strong> repas (borne basse)`,
+                    `Stock optimal : <strong>${Math.ceil((total + intervalle.haut) / 2)}</strong> repas`
+                ];
+            } else {
+                recommandations = [
+                    `Préparer <strong>${Math.ceil(total * 1.1)}</strong> repas (marge de sécurité 10%)`,
+                    `Stock minimum recommandé : <strong>${Math.ceil(total * 0.9)}</strong> repas`,
+                    `Stock optimal : <strong>${Math.ceil(total * 1.05)}</strong> repas (marge 5%)`
+                ];
+            }
 
             document.getElementById('recommendationsList').innerHTML = 
                 recommandations.map(r => `<li>${r}</li>`).join('');
@@ -617,13 +1101,123 @@ HTML_TEMPLATE = """
             }
 
             resultsDiv.classList.add('show');
-            resultsDiv.scrollIntoView({ behavior: 'smooth' });
+            if (defiler) {
+                resultsDiv.scrollIntoView({ behavior: 'smooth' });
+            }
         }
     </script>
 </body>
 </html>
 """
 
+# La page ne dépend d'aucune donnée de requête : rendue et compressée une fois
+with app.app_context():
+    page_prediction = PageStatique(render_template_string(
+                                       HTML_TEMPLATE, prechargement=app.config['PRECHARGEMENT_UI']),
+                                   max_age=app.config['CACHE_PAGE_SECONDES'])
+
+
+profils = ProfilsAgreges(app.config['PROFILAGE_DOSSIER'])
+
+
+def jeton_valide(jeton, cle_config):
+    """Compare un jeton reçu en en-tête au jeton configuré (vide : refusé).
+    Les jetons ne sont jamais lus dans l'URL, qui finit dans les journaux."""
+    attendu = app.config[cle_config]
+    return bool(attendu) and jeton is not None and hmac.compare_digest(jeton.encode(), attendu.encode())
+
+
+def profilage_demande():
+    """Profilage demandé par la requête (en-tête X-Profilage portant
+    PROFILAGE_JETON) ou tiré au sort selon PROFILAGE_TAUX."""
+    if jeton_valide(request.headers.get('X-Profilage'), 'PROFILAGE_JETON'):
+        return True
+    taux = app.config['PROFILAGE_TAUX']
+    return request.endpoint == 'predict' and taux > 0 and random.random() < taux
+
+
+def arreter_profilage():
+    profileur = g.pop('profileur', None)
+    if profileur is None:
+        return None, 0
+    piles = profileur.arreter()
+    chemin = profils.ajouter(request.endpoint or 'inconnue', piles)
+    return chemin, sum(piles.values())
+
+
+@app.before_request
+def demarrer_chrono():
+    g.debut_requete = time.perf_counter()
+    if profilage_demande():
+        g.profileur = ProfileurEchantillonnage(threading.get_ident()).demarrer()
+
+
+@app.after_request
+def enregistrer_metriques(response):
+    route = request.url_rule.rule if request.url_rule else 'inconnue'
+    requetes_total.inc(route=route, methode=request.method, code=str(response.status_code))
+    if 'debut_requete' in g:
+        debut = g.debut_requete
+        if response.is_streamed:
+            # Réponse en flux : la durée court jusqu'à la fin de l'envoi
+            response.call_on_close(
+                lambda: duree_requete.observer(time.perf_counter() - debut, route=route))
+        else:
+            duree_requete.observer(time.perf_counter() - debut, route=route)
+    return response
+
+
+@app.after_request
+def terminer_profilage(response):
+    if response.is_streamed and 'profileur' in g:
+        # Réponse en flux : le corps est produit après cette fonction,
+        # l'échantillonnage s'arrête à la fin de l'envoi
+        profileur, route = g.pop('profileur'), request.endpoint or 'inconnue'
+        response.call_on_close(lambda: profils.ajouter(route, profileur.arreter()))
+        response.headers['X-Profilage'] = f'{profils.chemin(route)}; echantillons=flux'
+        return response
+    chemin, echantillons = arreter_profilage()
+    if chemin is not None:
+        response.headers['X-Profilage'] = f'{chemin}; echantillons={echantillons}'
+    return response
+
+
+@app.after_request
+def compresser_json(response):
+    return compresser_reponse(response, request)
+
+
+@app.teardown_request
+def liberer_profilage(exception=None):
+    # Requête interrompue par une exception : arrêter le thread d'échantillonnage
+    arreter_profilage()
+
+
+# Réglage du profilage sans redémarrer le serveur
+@app.route('/api/profilage', methods=['GET', 'POST'])
+def regler_profilage():
+    if request.method == 'POST':
+        if not jeton_valide(request.headers.get('X-Profilage'), 'PROFILAGE_JETON'):
+            return jsonify({'error': "Jeton de profilage (X-Profilage) manquant ou invalide"}), 403
+        try:
+            taux = float(request.get_json()['taux'])
+            if not 0.0 <= taux <= 1.0:
+                raise ValueError("'taux' doit être compris entre 0 et 1")
+        except Exception as e:
+            return jsonify({'error': str(e)}), 400
+        app.config['PROFILAGE_TAUX'] = taux
+    return jsonify({
+        'taux': app.config['PROFILAGE_TAUX'],
+        'dossier': app.config['PROFILAGE_DOSSIER'],
+        'a_la_demande': bool(app.config['PROFILAGE_JETON'])
+    })
+
+
+# Métriques au format Prometheus
+@app.route('/metrics')
+def exposer_metriques():
+    return Response(registre.exposer(), mimetype='text/plain; version=0.0.4')
+
 
 # Redirection de la page d'accueil
 @app.route('/')
@@ -634,43 +1228,96 @@ def home():
 # Route principale avec nom personnalisé
 @app.route('/systeme-prediction-restaurant')
 def systeme_prediction():
-    return render_template_string(HTML_TEMPLATE)
+    return page_prediction.reponse(request)
 
 
 # API de prédiction
 @app.route('/api/predire', methods=['POST'])
 def predict():
     try:
-        data = request.get_json()
+        with duree_etape.chronometrer(etape='lecture_json'):
+            data = request.get_json()
+
+        quantiles = None
+        if data.get('intervalles'):
+            quantiles = valider_quantiles(data.get('quantiles', QUANTILES_DEFAUT))
+
+        if 'date_debut' in data and flux_demande(data):
+            return flux_previsions(data, quantiles)
 
-        jour_semaine = data['jour_semaine']
-        jour = data['jour']
-        mois = data['mois']
-        annee = data['annee']
-        weekend = data['weekend']
-        jour_ferie = data['jour_ferie']
+        with duree_etape.chronometrer(etape='calendrier'):
+            table = table_calendrier(data)
+        variantes = None
+        with duree_etape.chronometrer(etape='prediction'):
+            lignes = predire_table(table, data, quantiles)
+            if 'date_debut' in data and data.get('variantes'):
+                variantes = predire_variantes(table, data, quantiles)
+        lignes_total.inc(len(lignes))
 
-        jour_annee = (mois - 1) * 30 + jour
-        trimestre = (mois - 1) // 3 + 1
-        semaine_annee = mois * 4
+        with duree_etape.chronometrer(etape='serialisation'):
+            if 'date_debut' in data:
+                return jsonify({'previsions': lignes_plage(table, lignes, variantes)})
+
+            predictions = lignes[0]
+            predictions['Calendrier'] = infos_calendrier(table)[0]
+            return jsonify(predictions)
+
+    except Exception as e:
+        erreurs_total.inc(type=type(e).__name__)
+        return jsonify({'error': str(e)}), 400
 
-        X_new = pd.DataFrame([[
-            jour_semaine, mois, annee, jour_ferie, weekend,
-            jour_annee, trimestre, semaine_annee
-        ]], columns=features)
 
-        predictions = {}
-        for target, model in models.items():
-            pred = max(0, int(model.predict(X_new)[0]))
-            predictions[target] = pred
+# Prévisions stockées comparées à la fréquentation réelle
+@app.route('/api/previsions/comparaison', methods=['GET'])
+def comparer_previsions():
+    if stock is None:
+        return jsonify({'error': 'Base des prévisions désactivée'}), 404
+    try:
+        debut = lire_date(request.args['debut']).isoformat()
+        fin = lire_date(request.args['fin']).isoformat()
+        lignes = stock.comparer(debut, fin, request.args.get('site', SITE_DEFAUT),
+                                request.args.get('version'))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
 
-        predictions['Total'] = sum(predictions.values())
+    mae = {}
+    if lignes:
+        for colonne in ['Petit_Dejeuner', 'Dejeuner', 'Diner', 'Total']:
+            mae[colonne] = sum(abs(l['erreur'][colonne]) for l in lignes) / len(lignes)
+    return jsonify({'jours': len(lignes), 'mae': mae, 'comparaison': lignes})
 
-        return jsonify(predictions)
 
+# Fréquentation réelle : enregistrée et transmise à la surveillance
+@app.route('/api/frequentation', methods=['POST'])
+def ingerer_frequentation():
+    if stock is None:
+        return jsonify({'error': 'Base des prévisions désactivée'}), 404
+    if not jeton_valide(request.headers.get('X-Ingestion'), 'INGESTION_JETON'):
+        return jsonify({'error': "Jeton de saisie (X-Ingestion) manquant ou invalide"}), 403
+    try:
+        data = request.get_json()
+        site = data.get('site', SITE_DEFAUT)
+        entrees = data.get('frequentations', [data])
+        dates = [lire_date(entree['date']).isoformat() for entree in entrees]
+        reels = []
+        for entree in entrees:
+            reel = {repas: int(entree[repas]) for repas in ['Petit_Dejeuner', 'Dejeuner', 'Diner']}
+            reel['Total'] = int(entree.get('Total', sum(reel.values())))
+            reels.append(reel)
+        previsions = predire_table(calendrier.features(dates), {'site': site})
     except Exception as e:
+        erreurs_total.inc(type=type(e).__name__)
         return jsonify({'error': str(e)}), 400
 
+    stock.enregistrer_reel(site, zip(dates, reels))
+    alertes = observer_frequentation(dates, reels, previsions)
+    return jsonify({'jours': len(dates), 'alertes': alertes})
+
+
+@app.route('/api/surveillance', methods=['GET'])
+def etat_surveillance():
+    return jsonify(surveillance.etat())
+
 
 if __name__ == '__main__':
     print("\n" + "=" * 70)
@@ -0,0 +1,254 @@
+"""
+BENCHMARKS - RESTAURANT UNIVERSITAIRE
+=====================================
+Mesure les performances du système de prédiction :
+
+- temps de chargement des modèles
+- latence d'une prédiction unitaire (avec et sans intervalles)
+- débit des prédictions par lot, pour plusieurs tailles de lot
+- requêtes /api/predire de bout en bout (client de test Flask, en parallèle),
+  sans la base des prévisions puis avec une base temporaire (calcul et
+  écriture, puis relecture)
+- durée de chaque étape de l'entraînement (option --entrainement)
+
+Les résultats sont sauvegardés en JSON pour comparer les exécutions.
+
+UTILISATION :
+python benchmark.py                                  # benchmarks de service
+python benchmark.py --entrainement                   # + étapes d'entraînement
+python benchmark.py --comparer benchmarks/ancien.json --seuil 0.10
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import joblib
+import numpy as np
+
+REPAS = ['Petit_Dejeuner', 'Dejeuner', 'Diner']
+
+TAILLES_LOT = [1, 10, 100, 1000, 10000]
+CONCURRENCES = [1, 4, 16]
+
+
+def mesurer(fonction, repetitions, echauffement=2):
+    """Exécute ``fonction`` plusieurs fois et renvoie les durées (secondes)."""
+    for _ in range(echauffement):
+        fonction()
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - debut)
+    return np.array(durees)
+
+
+class Resultats:
+    """Collecte les mesures sous la forme {nom: {valeur, unite, meilleur}}.
+
+    ``meilleur`` vaut 'bas' pour une durée et 'haut' pour un débit : c'est
+    ce qui permet de détecter une régression lors d'une comparaison.
+    """
+
+    def __init__(self):
+        self.mesures = {}
+
+    def ajouter(self, nom, valeur, unite, meilleur='bas'):
+        self.mesures[nom] = {'valeur': float(valeur), 'unite': unite, 'meilleur': meilleur}
+        print(f"   {nom:<50}: {valeur:>12.3f} {unite}")
+
+    def latences(self, nom, durees):
+        durees_ms = durees * 1000
+        self.ajouter(f'{nom}.p50', np.percentile(durees_ms, 50), 'ms')
+        self.ajouter(f'{nom}.p95', np.percentile(durees_ms, 95), 'ms')
+        self.ajouter(f'{nom}.p99', np.percentile(durees_ms, 99), 'ms')
+
+    def sauvegarder(self, chemin, contexte=None):
+        dossier = os.path.dirname(chemin)
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+        contenu = {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'machine': {
+                'python': sys.version.split()[0],
+                'plateforme': platform.platform(),
+                'processeurs': os.cpu_count()
+            },
+            'mesures': self.mesures
+        }
+        if contexte:
+            contenu['contexte'] = contexte
+        with open(chemin, 'w', encoding='utf-8') as f:
+            json.dump(contenu, f, indent=2, ensure_ascii=False)
+        print(f"\n✅ Résultats sauvegardés : {chemin}")
+
+
+def bench_chargement(resultats, repetitions):
+    print("\n📂 Chargement des modèles...")
+    for target in REPAS:
+        durees = mesurer(lambda: joblib.load(f'model_{target}.pkl'), repetitions, echauffement=0)
+        resultats.ajouter(f'chargement.{target}', np.median(durees) * 1000, 'ms')
+
+
+def bench_prediction(resultats, app_web, repetitions):
+    print("\n🎯 Prédiction unitaire...")
+    X = app_web.calendrier.features(['2025-02-10'])[app_web.features]
+    for target, model in app_web.models.items():
+        resultats.latences(f'unitaire.{target}', mesurer(lambda: model.predict(X), repetitions))
+    resultats.latences('unitaire.trois_repas',
+                       mesurer(lambda: app_web.predire_lignes(X), repetitions))
+    resultats.latences('unitaire.intervalles',
+                       mesurer(lambda: app_web.predire_lignes(X, app_web.QUANTILES_DEFAUT),
+                               repetitions))
+
+
+def bench_lots(resultats, app_web, repetitions):
+    print("\n📦 Débit par lot...")
+    table = app_web.calendrier.plage('2024-01-01', '2051-12-31')[app_web.features]
+    for taille in TAILLES_LOT:
+        X = table.iloc[:taille]
+        durees = mesurer(lambda: app_web.predire_lignes(X), max(3, repetitions // 10))
+        resultats.ajouter(f'lot.{taille}.debit', taille / np.median(durees),
+                          'lignes/s', meilleur='haut')
+
+
+CORPS_API = [{'date': f'2025-{mois:02d}-{jour:02d}'}
+             for mois in range(1, 13) for jour in range(1, 29)]
+
+
+def bench_api(resultats, app_web, n_requetes, prefixe='api'):
+    print(f"\n🌐 API /api/predire de bout en bout ({prefixe})...")
+    corps = CORPS_API
+
+    def requete(i):
+        client = app_web.app.test_client()
+        debut = time.perf_counter()
+        reponse = client.post('/api/predire', json=corps[i % len(corps)])
+        return time.perf_counter() - debut, reponse.status_code
+
+    for concurrence in CONCURRENCES:
+        debut = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrence) as executor:
+            reponses = list(executor.map(requete, range(n_requetes)))
+        duree_totale = time.perf_counter() - debut
+
+        durees = np.array([d for d, _ in reponses])
+        erreurs = sum(1 for _, code in reponses if code != 200)
+        resultats.latences(f'{prefixe}.concurrence_{concurrence}', durees)
+        resultats.ajouter(f'{prefixe}.concurrence_{concurrence}.debit',
+                          n_requetes / duree_totale, 'requêtes/s', meilleur='haut')
+        resultats.ajouter(f'{prefixe}.concurrence_{concurrence}.erreurs', erreurs, 'requêtes')
+
+
+def bench_stock(resultats, app_web, n_requetes):
+    """/api/predire avec une base des prévisions temporaire : premier
+    passage (calcul et écriture), puis relecture depuis la base."""
+    print("\n🗄️  API /api/predire avec la base des prévisions...")
+    from stockage import StockPrevisions
+
+    stock_initial = app_web.stock
+    client = app_web.app.test_client()
+    with tempfile.TemporaryDirectory() as dossier:
+        app_web.stock = StockPrevisions(os.path.join(dossier, 'previsions.db'))
+        try:
+            durees = []
+            for corps in CORPS_API:
+                debut = time.perf_counter()
+                client.post('/api/predire', json=corps)
+                durees.append(time.perf_counter() - debut)
+            resultats.latences('api_stock.calcul_ecriture', np.array(durees))
+            bench_api(resultats, app_web, n_requetes, 'api_stock.relecture')
+        finally:
+            app_web.stock = stock_initial
+
+
+def bench_entrainement(resultats):
+    print("\n🤖 Étapes de l'entraînement...")
+    import matplotlib
+    matplotlib.use('Agg')
+    import train_model
+
+    chemin_donnees = os.path.abspath('Data base (csv).csv')
+    with tempfile.TemporaryDirectory() as dossier:
+        _, _, durees_etapes = train_model.executer_pipeline(chemin_donnees, dossier)
+    for etape, duree in durees_etapes.items():
+        resultats.ajouter(f'entrainement.{etape}', duree, 's')
+    resultats.ajouter('entrainement.total', sum(durees_etapes.values()), 's')
+
+
+def comparer(resultats, chemin_reference, seuil):
+    """Signale les mesures dégradées de plus de ``seuil`` (relatif)."""
+    with open(chemin_reference, 'r', encoding='utf-8') as f:
+        reference = json.load(f)['mesures']
+
+    print(f"\n🔍 Comparaison avec {chemin_reference} (seuil {seuil:.0%})")
+    print("-" * 70)
+    regressions = []
+    for nom, mesure in resultats.mesures.items():
+        if nom not in reference or reference[nom]['valeur'] == 0:
+            continue
+        ancien = reference[nom]['valeur']
+        ecart = (mesure['valeur'] - ancien) / ancien
+        if mesure['meilleur'] == 'haut':
+            ecart = -ecart
+        if ecart > seuil:
+            regressions.append(nom)
+            print(f"   ❌ {nom:<50}: {ancien:.3f} → {mesure['valeur']:.3f} "
+                  f"{mesure['unite']} ({ecart:+.0%})")
+
+    if regressions:
+        print(f"\n⚠️  {len(regressions)} régression(s) détectée(s)")
+    else:
+        print("   ✅ Aucune régression")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du système de prédiction")
+    parser.add_argument('--repetitions', type=int, default=100,
+                        help="Répétitions pour les mesures de latence")
+    parser.add_argument('--requetes', type=int, default=500,
+                        help="Nombre de requêtes API par niveau de concurrence")
+    parser.add_argument('--entrainement', action='store_true',
+                        help="Mesurer aussi les étapes de l'entraînement")
+    parser.add_argument('--sortie', default=f"benchmarks/benchmark_{datetime.now():%Y%m%d_%H%M%S}.json",
+                        help="Fichier JSON des résultats")
+    parser.add_argument('--comparer', help="Fichier JSON de référence")
+    parser.add_argument('--seuil', type=float, default=0.10,
+                        help="Dégradation relative tolérée avant de signaler une régression")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(" BENCHMARKS - SYSTÈME DE PRÉDICTION")
+    print("=" * 70)
+
+    resultats = Resultats()
+    bench_chargement(resultats, max(3, args.repetitions // 20))
+
+    # Sans base des prévisions : les mesures portent sur les modèles (et la
+    # base de production n'est pas modifiée) ; la base est mesurée à part
+    os.environ['STOCK_PREVISIONS'] = ''
+    import app_web
+    bench_prediction(resultats, app_web, args.repetitions)
+    bench_lots(resultats, app_web, args.repetitions)
+    bench_api(resultats, app_web, args.requetes)
+    bench_stock(resultats, app_web, args.requetes)
+
+    if args.entrainement:
+        bench_entrainement(resultats)
+
+    resultats.sauvegarder(args.sortie)
+
+    if args.comparer and comparer(resultats, args.comparer, args.seuil):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+CALENDRIER UNIVERSITAIRE - RESTAURANT UNIVERSITAIRE
+===================================================
+Index précalculé des jours de la semaine, weekends, jours fériés et périodes
+de vacances, utilisé pour dériver toutes les features calendaires à partir
+d'une simple date.
+
+Les jours fériés à date fixe sont générés automatiquement. Les fêtes
+religieuses (dates lunaires) et les vacances universitaires sont lues depuis
+'calendrier_universitaire.csv' (colonnes Debut, Fin, Type, Libelle), à
+compléter chaque année.
+"""
+
+import threading
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ['Jour_Semaine', 'Mois', 'Annee', 'Jour_Ferie', 'Weekend',
+            'Jour_Annee', 'Trimestre', 'Semaine_Annee']
+
+COLONNES = FEATURES + ['Vacances']
+
+# Jours fériés à date fixe : (jour, mois, libellé)
+FERIES_FIXES = [
+    (1, 1, 'Nouvel An'),
+    (12, 1, 'Yennayer'),
+    (1, 5, 'Fête du Travail'),
+    (5, 7, "Fête de l'Indépendance"),
+    (1, 11, 'Fête de la Révolution')
+]
+
+# Plage couverte par l'index précalculé
+DEBUT_INDEX = date(2020, 1, 1)
+FIN_INDEX = date(2035, 12, 31)
+
+JOURS = ['', 'Dimanche', 'Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi']
+
+
+def lire_date(valeur):
+    """Convertit 'aaaa-mm-jj' ou 'jj/mm/aaaa' en date."""
+    if isinstance(valeur, datetime):
+        return valeur.date()
+    if isinstance(valeur, date):
+        return valeur
+    for format_date in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(str(valeur), format_date).date()
+        except ValueError:
+            pass
+    raise ValueError(f"Date invalide : {valeur!r} (attendu aaaa-mm-jj ou jj/mm/aaaa)")
+
+
+def construire_features(dates, jours_feries):
+    """Construit, de façon vectorisée, les features d'une série de dates.
+
+    Les conventions sont celles du dataset d'entraînement : Jour_Semaine va
+    de 1 (Dimanche) à 7 (Samedi) et le weekend correspond au Vendredi et au
+    Samedi.
+    """
+    dates = pd.DatetimeIndex(dates).normalize()
+    jour_iso = dates.dayofweek.to_numpy()  # 0 = Lundi ... 6 = Dimanche
+
+    return pd.DataFrame({
+        'Jour_Semaine': (jour_iso + 1) % 7 + 1,
+        'Mois': dates.month,
+        'Annee': dates.year,
+        'Jour_Ferie': dates.isin(jours_feries).astype(int),
+        'Weekend': np.isin(jour_iso, [4, 5]).astype(int),
+        'Jour_Annee': dates.dayofyear,
+        'Trimestre': dates.quarter,
+        'Semaine_Annee': dates.isocalendar().week.to_numpy().astype(int)
+    }, index=dates)
+
+
+def charger_periodes(chemin):
+    """Lit les jours fériés variables et les vacances depuis le CSV."""
+    try:
+        periodes = pd.read_csv(chemin)
+    except FileNotFoundError:
+        print(f"⚠️  Calendrier '{chemin}' introuvable : jours fériés fixes uniquement")
+        return pd.DataFrame(columns=['Debut', 'Fin', 'Type', 'Libelle'])
+    periodes.columns = periodes.columns.str.strip()
+    periodes['Debut'] = pd.to_datetime(periodes['Debut'], dayfirst=True)
+    periodes['Fin'] = pd.to_datetime(periodes['Fin'], dayfirst=True)
+    return periodes
+
+
+def construire_calendrier(dates, periodes, jours_feries=()):
+    """Calcule les features calendaires, l'indicateur de vacances et le
+    libellé de chaque date, pour toute la série en une fois."""
+    dates = pd.DatetimeIndex(dates).normalize()
+    libelles = np.full(len(dates), '', dtype=object)
+
+    feries = [pd.Timestamp(annee, mois, jour)
+              for annee in np.unique(dates.year)
+              for jour, mois, _ in FERIES_FIXES]
+    for annee in np.unique(dates.year):
+        for jour, mois, libelle in FERIES_FIXES:
+            libelles[dates == pd.Timestamp(annee, mois, jour)] = libelle
+
+    vacances = np.zeros(len(dates), dtype=bool)
+    for periode in periodes.itertuples(index=False):
+        masque = (dates >= periode.Debut) & (dates <= periode.Fin)
+        if periode.Type == 'ferie':
+            feries.extend(dates[masque])
+            libelles[masque] = periode.Libelle
+        else:
+            vacances |= masque
+            libelles[masque & (libelles == '')] = periode.Libelle
+
+    feries.extend(pd.DatetimeIndex(jours_feries))
+    table = construire_features(dates, pd.DatetimeIndex(feries))
+    table['Vacances'] = vacances.astype(int)
+    table['Libelle'] = libelles
+    return table
+
+
+class CalendrierIndex:
+    """Calendrier précalculé jour par jour, consultable en O(1).
+
+    Chaque date de [debut, fin] correspond à une ligne d'un tableau numpy :
+    sa position est simplement l'écart en jours avec ``debut``. Les dates
+    hors de la plage sont calculées à la volée ; ``statistiques`` compte les
+    consultations servies par l'index ('succes') ou recalculées ('echecs').
+    """
+
+    def __init__(self, periodes, debut=DEBUT_INDEX, fin=FIN_INDEX, jours_feries=()):
+        self.periodes = periodes
+        self.jours_feries = pd.DatetimeIndex(jours_feries)
+        self.debut = lire_date(debut)
+        self.fin = lire_date(fin)
+
+        table = construire_calendrier(pd.date_range(self.debut, self.fin),
+                                      periodes, self.jours_feries)
+        self._valeurs = table[COLONNES].to_numpy(dtype=np.int64)
+        self._libelles = table['Libelle'].to_numpy()
+        self._ordinal_debut = self.debut.toordinal()
+        self.statistiques = {'succes': 0, 'echecs': 0}
+        self._verrou_statistiques = threading.Lock()
+
+    @classmethod
+    def charger(cls, chemin='calendrier_universitaire.csv', **kwargs):
+        return cls(charger_periodes(chemin), **kwargs)
+
+    def _compter(self, resultat):
+        # Consulté depuis plusieurs threads de requêtes
+        with self._verrou_statistiques:
+            self.statistiques[resultat] += 1
+
+    def __len__(self):
+        return len(self._valeurs)
+
+    def _positions(self, dates):
+        positions = np.array([d.toordinal() for d in dates]) - self._ordinal_debut
+        if len(positions) and (positions.min() < 0 or positions.max() >= len(self)):
+            return None
+        return positions
+
+    def _table(self, dates, positions):
+        table = pd.DataFrame(self._valeurs[positions], columns=COLONNES,
+                             index=pd.DatetimeIndex(dates))
+        table['Libelle'] = self._libelles[positions]
+        return table
+
+    def infos(self, jour):
+        """Toutes les informations calendaires d'une date."""
+        jour = lire_date(jour)
+        position = jour.toordinal() - self._ordinal_debut
+        if 0 <= position < len(self):
+            self._compter('succes')
+            valeurs = dict(zip(COLONNES, self._valeurs[position].tolist()))
+            valeurs['Libelle'] = self._libelles[position]
+        else:
+            self._compter('echecs')
+            ligne = construire_calendrier([jour], self.periodes, self.jours_feries).iloc[0]
+            valeurs = {col: int(ligne[col]) for col in COLONNES}
+            valeurs['Libelle'] = ligne['Libelle']
+        return valeurs
+
+    def features(self, dates):
+        """Table calendaire (features, Vacances, Libelle) d'une liste de dates."""
+        dates = [lire_date(d) for d in dates]
+        positions = self._positions(dates)
+        if positions is None:
+            self._compter('echecs')
+            return construire_calendrier(dates, self.periodes, self.jours_feries)
+        self._compter('succes')
+        return self._table(dates, positions)
+
+    def plage(self, debut, fin):
+        """Table calendaire de tous les jours de [debut, fin]."""
+        debut, fin = lire_date(debut), lire_date(fin)
+        if fin < debut:
+            raise ValueError("La date de fin doit être postérieure à la date de début")
+        premier = debut.toordinal() - self._ordinal_debut
+        dernier = fin.toordinal() - self._ordinal_debut
+        dates = pd.date_range(debut, fin)
+        if premier < 0 or dernier >= len(self):
+            self._compter('echecs')
+            return construire_calendrier(dates, self.periodes, self.jours_feries)
+        self._compter('succes')
+        return self._table(dates, np.arange(premier, dernier + 1))
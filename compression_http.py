@@ -0,0 +1,101 @@
+"""
+COMPRESSION HTTP - RESTAURANT UNIVERSITAIRE
+===========================================
+Négociation gzip / brotli et réponses conditionnelles (ETag) pour la page
+web et les réponses JSON volumineuses.
+
+Chaque encodage a son propre ETag fort ("<empreinte>-gzip", "<empreinte>-br",
+"<empreinte>" sans compression) : les octets envoyés diffèrent, un cache ne
+doit donc pas revalider une variante avec l'ETag d'une autre.
+
+brotli est optionnel : pip install brotli. Sans lui, seul gzip est proposé.
+"""
+
+import gzip
+import hashlib
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODAGES = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+# Taille minimale (octets) d'une réponse JSON pour la compresser
+SEUIL_COMPRESSION = 1400
+
+
+def choisir_encodage(requete):
+    """Meilleur encodage accepté par le client, ou None."""
+    return requete.accept_encodings.best_match(ENCODAGES)
+
+
+def compresser(donnees, encodage, maximal=False):
+    """Compresse ``donnees`` ; ``maximal`` pour les contenus compressés une
+    seule fois (page statique), sinon un niveau rapide."""
+    if encodage == 'br':
+        return brotli.compress(donnees, quality=11 if maximal else 5)
+    return gzip.compress(donnees, compresslevel=9 if maximal else 6)
+
+
+def etag_variante(empreinte, encodage):
+    """ETag de la variante ``encodage`` (None : non compressée) d'un contenu."""
+    return f'{empreinte}-{encodage}' if encodage else empreinte
+
+
+class PageStatique:
+    """Page rendue une seule fois, avec son empreinte et ses variantes
+    précompressées pour chaque encodage."""
+
+    def __init__(self, contenu, mimetype='text/html', max_age=300):
+        self.mimetype = mimetype
+        self.max_age = max_age
+        self.donnees = contenu.encode('utf-8')
+        self.etag = hashlib.sha1(self.donnees).hexdigest()[:16]
+        self.variantes = {encodage: compresser(self.donnees, encodage, maximal=True)
+                          for encodage in ENCODAGES}
+
+    def reponse(self, requete):
+        encodage = choisir_encodage(requete)
+        etag = etag_variante(self.etag, encodage)
+        if requete.if_none_match.contains(etag):
+            reponse = Response(status=304)
+        else:
+            reponse = Response(self.variantes.get(encodage, self.donnees),
+                               mimetype=self.mimetype)
+            if encodage:
+                reponse.headers['Content-Encoding'] = encodage
+        reponse.set_etag(etag)
+        reponse.headers['Cache-Control'] = f'public, max-age={self.max_age}'
+        reponse.vary.add('Accept-Encoding')
+        return reponse
+
+
+def compresser_reponse(reponse, requete, seuil=SEUIL_COMPRESSION):
+    """Compresse une réponse JSON volumineuse selon Accept-Encoding ; les
+    réponses GET reçoivent en plus l'ETag de l'encodage retenu et deviennent
+    conditionnelles."""
+    if (reponse.mimetype != 'application/json' or reponse.direct_passthrough
+            or reponse.is_streamed or 'Content-Encoding' in reponse.headers):
+        return reponse
+
+    reponse.vary.add('Accept-Encoding')
+    encodage = choisir_encodage(requete)
+    if reponse.content_length is None or reponse.content_length < seuil:
+        encodage = None
+
+    if requete.method == 'GET' and reponse.status_code == 200:
+        empreinte = hashlib.sha1(reponse.get_data()).hexdigest()[:16]
+        reponse.set_etag(etag_variante(empreinte, encodage))
+        reponse.make_conditional(requete)
+        if reponse.status_code == 304:
+            return reponse
+
+    if encodage is None:
+        return reponse
+
+    reponse.set_data(compresser(reponse.get_data(), encodage))
+    reponse.headers['Content-Encoding'] = encodage
+    return reponse
@@ -0,0 +1,106 @@
+"""
+ESTIMATEURS - RESTAURANT UNIVERSITAIRE
+======================================
+Modèles candidats pour chaque repas, tous utilisables par l'application
+(interface fit / predict de scikit-learn) :
+
+- 'foret'    : Random Forest (modèle historique)
+- 'boosting' : gradient boosting à histogrammes
+- 'ridge'    : régression ridge saisonnière (jour de semaine, mois, année
+               universitaire lissée par splines périodiques)
+
+``selectionner`` entraîne les candidats, mesure leur MAE de validation et
+leur latence de prédiction d'un jour, puis retient le plus précis parmi ceux
+qui respectent le budget de latence.
+"""
+
+import time
+
+import numpy as np
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+from sklearn.linear_model import RidgeCV
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import OneHotEncoder, SplineTransformer, StandardScaler
+
+# Budget de latence par défaut pour prédire un jour (millisecondes)
+BUDGET_LATENCE_MS = 50.0
+
+
+def creer_foret():
+    return RandomForestRegressor(
+        n_estimators=200,
+        max_depth=20,
+        min_samples_split=3,
+        min_samples_leaf=2,
+        max_features='sqrt',
+        random_state=42,
+        n_jobs=-1,
+        bootstrap=True
+    )
+
+
+def creer_boosting():
+    return HistGradientBoostingRegressor(
+        loss='absolute_error',
+        max_iter=300,
+        learning_rate=0.05,
+        min_samples_leaf=5,
+        categorical_features=['Jour_Semaine', 'Mois'],
+        random_state=42
+    )
+
+
+def creer_ridge():
+    colonnes = ColumnTransformer([
+        ('categories', OneHotEncoder(handle_unknown='ignore'), ['Jour_Semaine', 'Mois']),
+        ('saison', SplineTransformer(n_knots=13, degree=3, extrapolation='periodic'),
+         ['Jour_Annee']),
+        ('indicateurs', StandardScaler(), ['Annee', 'Jour_Ferie', 'Weekend'])
+    ])
+    return make_pipeline(colonnes, RidgeCV(alphas=np.logspace(-2, 3, 12)))
+
+
+ESTIMATEURS = {
+    'foret': creer_foret,
+    'boosting': creer_boosting,
+    'ridge': creer_ridge
+}
+
+
+def latence_unitaire(model, X, repetitions=20):
+    """Durée médiane (ms) de la prédiction d'une seule ligne."""
+    ligne = X.iloc[:1]
+    model.predict(ligne)
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        model.predict(ligne)
+        durees.append(time.perf_counter() - debut)
+    return float(np.median(durees)) * 1000
+
+
+def selectionner(X_train, y_train, X_val, y_val, candidats=tuple(ESTIMATEURS),
+                 budget_latence_ms=BUDGET_LATENCE_MS):
+    """Évalue chaque candidat sur la validation et choisit le meilleur.
+
+    Renvoie le nom retenu, ses résidus de validation (y - ŷ) et le détail
+    ``{nom: {'mae_validation', 'latence_ms', 'dans_budget'}}``.
+    """
+    resultats = {}
+    residus = {}
+    for nom in candidats:
+        model = ESTIMATEURS[nom]()
+        model.fit(X_train, y_train)
+        residus[nom] = np.asarray(y_val, dtype=float) - model.predict(X_val)
+        latence = latence_unitaire(model, X_val)
+        resultats[nom] = {
+            'mae_validation': float(np.abs(residus[nom]).mean()),
+            'latence_ms': latence,
+            'dans_budget': latence <= budget_latence_ms
+        }
+
+    # Si aucun candidat ne tient le budget, le plus précis est retenu quand même
+    eligibles = [nom for nom in candidats if resultats[nom]['dans_budget']] or list(candidats)
+    choisi = min(eligibles, key=lambda nom: resultats[nom]['mae_validation'])
+    return choisi, residus[choisi], resultats
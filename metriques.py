@@ -0,0 +1,204 @@
+"""
+MÉTRIQUES - RESTAURANT UNIVERSITAIRE
+====================================
+Registre de métriques en mémoire (compteurs, histogrammes, jauges) exposé au
+format texte de Prometheus, sans dépendance externe.
+
+Chaque mise à jour ne coûte qu'un verrou et quelques additions : les
+métriques peuvent rester activées en permanence.
+"""
+
+import bisect
+import os
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Bornes des histogrammes de latence, en secondes
+BUCKETS_LATENCE = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _echapper(valeur):
+    """Échappement des valeurs de labels du format texte de Prometheus."""
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(noms, valeurs, extra=''):
+    paires = [f'{nom}="{_echapper(valeur)}"' for nom, valeur in zip(noms, valeurs)]
+    if extra:
+        paires.append(extra)
+    return '{' + ','.join(paires) + '}' if paires else ''
+
+
+def _format_valeur(valeur):
+    if valeur == float('inf'):
+        return '+Inf'
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+
+class Compteur:
+    """Compteur monotone, éventuellement ventilé par labels."""
+
+    type_metrique = 'counter'
+
+    def __init__(self, nom, aide, labels=()):
+        self.nom = nom
+        self.aide = aide
+        self.labels = tuple(labels)
+        self._valeurs = {}
+        self._verrou = threading.Lock()
+
+    def inc(self, valeur=1, **labels):
+        cle = tuple(labels[nom] for nom in self.labels)
+        with self._verrou:
+            self._valeurs[cle] = self._valeurs.get(cle, 0) + valeur
+
+    def echantillons(self):
+        with self._verrou:
+            valeurs = list(self._valeurs.items())
+        for cle, valeur in valeurs:
+            yield self.nom + _format_labels(self.labels, cle), valeur
+
+
+class _Chrono:
+    __slots__ = ('histogramme', 'cle', 'debut')
+
+    def __init__(self, histogramme, cle):
+        self.histogramme = histogramme
+        self.cle = cle
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogramme._observer(self.cle, time.perf_counter() - self.debut)
+        return False
+
+
+class Histogramme:
+    """Histogramme cumulatif à bornes fixes (somme et nombre inclus)."""
+
+    type_metrique = 'histogram'
+
+    def __init__(self, nom, aide, labels=(), buckets=BUCKETS_LATENCE):
+        self.nom = nom
+        self.aide = aide
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._verrou = threading.Lock()
+
+    def _observer(self, cle, valeur):
+        indice = bisect.bisect_left(self.buckets, valeur)
+        with self._verrou:
+            serie = self._series.get(cle)
+            if serie is None:
+                serie = self._series[cle] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valeur
+            serie[2] += 1
+
+    def observer(self, valeur, **labels):
+        self._observer(tuple(labels[nom] for nom in self.labels), valeur)
+
+    def chronometrer(self, **labels):
+        """Context manager qui observe la durée du bloc, en secondes."""
+        return _Chrono(self, tuple(labels[nom] for nom in self.labels))
+
+    def echantillons(self):
+        with self._verrou:
+            series = [(cle, list(comptes), somme, nombre)
+                      for cle, (comptes, somme, nombre) in self._series.items()]
+        for cle, comptes, somme, nombre in series:
+            cumul = 0
+            for borne, compte in zip(self.buckets + (float('inf'),), comptes):
+                cumul += compte
+                le = f'le="{_format_valeur(borne)}"'
+                yield self.nom + '_bucket' + _format_labels(self.labels, cle, le), cumul
+            yield self.nom + '_sum' + _format_labels(self.labels, cle), somme
+            yield self.nom + '_count' + _format_labels(self.labels, cle), nombre
+
+
+class Jauge:
+    """Valeur instantanée lue au moment de l'exposition.
+
+    ``fonction`` renvoie soit un nombre, soit une liste de couples
+    (valeurs des labels, nombre).
+    """
+
+    type_metrique = 'gauge'
+
+    def __init__(self, nom, aide, fonction, labels=(), type_metrique='gauge'):
+        self.nom = nom
+        self.aide = aide
+        self.fonction = fonction
+        self.labels = tuple(labels)
+        self.type_metrique = type_metrique
+
+    def echantillons(self):
+        valeur = self.fonction()
+        if not self.labels:
+            yield self.nom, valeur
+            return
+        for cle, v in valeur:
+            yield self.nom + _format_labels(self.labels, cle), v
+
+
+class Registre:
+    """Ensemble des métriques exposées par l'application."""
+
+    def __init__(self):
+        self._metriques = []
+
+    def _ajouter(self, metrique):
+        self._metriques.append(metrique)
+        return metrique
+
+    def compteur(self, nom, aide, labels=()):
+        return self._ajouter(Compteur(nom, aide, labels))
+
+    def histogramme(self, nom, aide, labels=(), buckets=BUCKETS_LATENCE):
+        return self._ajouter(Histogramme(nom, aide, labels, buckets))
+
+    def jauge(self, nom, aide, fonction, labels=(), type_metrique='gauge'):
+        return self._ajouter(Jauge(nom, aide, fonction, labels, type_metrique))
+
+    def exposer(self):
+        """Texte au format d'exposition Prometheus (version 0.0.4)."""
+        lignes = []
+        for metrique in self._metriques:
+            lignes.append(f'# HELP {metrique.nom} {metrique.aide}')
+            lignes.append(f'# TYPE {metrique.nom} {metrique.type_metrique}')
+            for nom, valeur in metrique.echantillons():
+                lignes.append(f'{nom} {_format_valeur(valeur)}')
+        return '\n'.join(lignes) + '\n'
+
+
+def memoire_residente():
+    """Mémoire résidente du processus, en octets."""
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return 0
+        # ru_maxrss : pic de mémoire, en kilo-octets sous Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def ajouter_metriques_processus(registre):
+    """Mémoire, temps CPU et date de démarrage du processus."""
+    debut = time.time()
+    registre.jauge('process_resident_memory_bytes',
+                   'Mémoire résidente du processus en octets.', memoire_residente)
+    registre.jauge('process_cpu_seconds_total',
+                   'Temps CPU consommé par le processus en secondes.',
+                   time.process_time, type_metrique='counter')
+    registre.jauge('process_start_time_seconds',
+                   'Date de démarrage du processus (epoch) en secondes.', lambda: debut)
@@ -0,0 +1,243 @@
+"""
+MODÈLES COMPACTS - RESTAURANT UNIVERSITAIRE
+===========================================
+Export des forêts aléatoires dans un format compact pour le service :
+tous les arbres sont mis bout à bout dans quelques tableaux numpy, avec des
+indices de nœuds entiers de petite taille, des seuils en float32 et des
+valeurs de feuilles en précision réduite (float16 par défaut), le tout
+compressé dans un fichier .npz.
+
+UTILISATION :
+python modele_compact.py                        # exporte et vérifie les modèles
+python modele_compact.py --precision float32 --tolerance 0.5
+
+Puis lancer l'application avec : MODELES_COMPACTS=1 python app_web.py
+
+Un export n'est conservé que s'il respecte la tolérance, et il mémorise
+l'empreinte du .pkl dont il est issu : après un réentraînement, un .npz
+périmé est ignoré (``chemin_compact``) et le .pkl est servi.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from calendrier import CalendrierIndex
+from stockage import empreinte_fichiers
+
+REPAS = ['Petit_Dejeuner', 'Dejeuner', 'Diner']
+
+
+def _plus_petit_entier(valeur_max):
+    for dtype in (np.uint8, np.uint16, np.uint32):
+        if valeur_max <= np.iinfo(dtype).max:
+            return dtype
+    return np.uint64
+
+
+class ForetCompacte:
+    """Forêt de régression stockée à plat, prédite sans scikit-learn.
+
+    Les enfants d'un nœud sont des indices locaux à son arbre ; ``debuts``
+    donne la position du premier nœud de chaque arbre. Une feuille pointe
+    sur elle-même, ce qui permet de parcourir tous les arbres et toutes les
+    lignes en même temps, pendant ``profondeur`` itérations vectorisées.
+    """
+
+    def __init__(self, debuts, gauche, droite, feature, seuil, valeur, profondeur, features,
+                 source=None):
+        self.debuts = debuts
+        self.gauche = gauche
+        self.droite = droite
+        self.feature = feature
+        self.seuil = seuil
+        self.valeur = valeur
+        self.profondeur = int(profondeur)
+        self.features = list(features)
+        # Empreinte du .pkl d'origine
+        self.source = source
+
+    @property
+    def n_estimators(self):
+        return len(self.debuts)
+
+    @classmethod
+    def depuis_foret(cls, foret, precision='float16', source=None):
+        """Convertit un RandomForestRegressor entraîné."""
+        arbres = [estimateur.tree_ for estimateur in foret.estimators_]
+        tailles = np.array([arbre.node_count for arbre in arbres])
+        dtype_indice = _plus_petit_entier(tailles.max() - 1)
+        dtype_feature = _plus_petit_entier(foret.n_features_in_ - 1)
+
+        gauche, droite, feature = [], [], []
+        for arbre in arbres:
+            locaux = np.arange(arbre.node_count)
+            feuille = arbre.children_left == -1
+            gauche.append(np.where(feuille, locaux, arbre.children_left))
+            droite.append(np.where(feuille, locaux, arbre.children_right))
+            feature.append(np.where(feuille, 0, arbre.feature))
+
+        return cls(
+            debuts=np.concatenate([[0], np.cumsum(tailles)[:-1]]).astype(np.int32),
+            gauche=np.concatenate(gauche).astype(dtype_indice),
+            droite=np.concatenate(droite).astype(dtype_indice),
+            feature=np.concatenate(feature).astype(dtype_feature),
+            seuil=np.concatenate([arbre.threshold for arbre in arbres]).astype(np.float32),
+            valeur=np.concatenate([arbre.value[:, 0, 0] for arbre in arbres]).astype(precision),
+            profondeur=max(arbre.max_depth for arbre in arbres),
+            features=getattr(foret, 'feature_names_in_', range(foret.n_features_in_)),
+            source=source
+        )
+
+    def _matrice(self, X):
+        if hasattr(X, 'columns'):
+            X = X[self.features]
+        return np.asarray(X, dtype=np.float32)
+
+    def predict_arbres(self, X):
+        """Prédictions de chaque arbre : tableau (n_arbres, n_lignes)."""
+        X = self._matrice(X)
+        lignes = np.arange(len(X))
+        debuts = self.debuts[:, None]
+        noeuds = np.broadcast_to(debuts, (self.n_estimators, len(X)))
+        for _ in range(self.profondeur):
+            a_gauche = X[lignes, self.feature[noeuds]] <= self.seuil[noeuds]
+            noeuds = debuts + np.where(a_gauche, self.gauche[noeuds], self.droite[noeuds])
+        return self.valeur[noeuds].astype(np.float64)
+
+    def predict(self, X):
+        return self.predict_arbres(X).mean(axis=0)
+
+    def sauvegarder(self, chemin):
+        np.savez_compressed(
+            chemin, debuts=self.debuts, gauche=self.gauche, droite=self.droite,
+            feature=self.feature, seuil=self.seuil, valeur=self.valeur,
+            meta=np.frombuffer(json.dumps({
+                'profondeur': self.profondeur,
+                'features': [str(f) for f in self.features],
+                'source': self.source
+            }).encode('utf-8'), dtype=np.uint8)
+        )
+
+
+def _lire_meta(contenu):
+    return json.loads(contenu['meta'].tobytes().decode('utf-8'))
+
+
+def charger_foret_compacte(chemin):
+    """Charge une forêt exportée par ``ForetCompacte.sauvegarder``."""
+    with np.load(chemin) as contenu:
+        meta = _lire_meta(contenu)
+        return ForetCompacte(
+            contenu['debuts'], contenu['gauche'], contenu['droite'], contenu['feature'],
+            contenu['seuil'], contenu['valeur'], meta['profondeur'], meta['features'],
+            meta.get('source')
+        )
+
+
+def chemin_compact(chemin_pkl):
+    """Chemin du .npz exporté depuis ``chemin_pkl`` tel qu'il est
+    actuellement, ou None (pas d'export, ou export d'un ancien modèle)."""
+    chemin_npz = os.path.splitext(chemin_pkl)[0] + '.npz'
+    if not os.path.exists(chemin_npz):
+        return None
+    with np.load(chemin_npz) as contenu:
+        source = _lire_meta(contenu).get('source')
+    if source is None or source != empreinte_fichiers([chemin_pkl]):
+        print(f"⚠️  {chemin_npz} ne correspond pas à {chemin_pkl} : relancez modele_compact.py")
+        return None
+    return chemin_npz
+
+
+def donnees_de_verification():
+    """Features de tous les jours 2024-2030, avec et sans jour férié forcé."""
+    table = CalendrierIndex.charger().plage('2024-01-01', '2030-12-31')
+    feries = table.copy()
+    feries['Jour_Ferie'] = 1 - feries['Jour_Ferie']
+    return pd.concat([table, feries])
+
+
+def duree_chargement(fonction, chemin, repetitions=5):
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction(chemin)
+        durees.append(time.perf_counter() - debut)
+    return min(durees)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export compact des modèles")
+    parser.add_argument('--precision', choices=['float16', 'float32'], default='float16',
+                        help="Précision des valeurs de feuilles")
+    parser.add_argument('--tolerance', type=float, default=1.0,
+                        help="Écart maximal toléré avec la forêt d'origine (étudiants)")
+    parser.add_argument('--modeles', default='.', help="Dossier des model_*.pkl")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(" EXPORT COMPACT DES MODÈLES")
+    print("=" * 70)
+
+    with open(os.path.join(args.modeles, 'features_list.txt'), 'r') as f:
+        features = f.read().strip().split(',')
+    X = donnees_de_verification()[features]
+
+    echec = False
+    for target in REPAS + ['Total']:
+        chemin_pkl = os.path.join(args.modeles, f'model_{target}.pkl')
+        chemin_npz = os.path.join(args.modeles, f'model_{target}.npz')
+        if target == 'Total' and not os.path.exists(chemin_pkl):
+            continue
+
+        foret = joblib.load(chemin_pkl)
+        if not hasattr(foret, 'estimators_'):
+            # Boosting ou ridge (voir estimateurs.py) : déjà rapide, servi en .pkl
+            if os.path.exists(chemin_npz):
+                os.remove(chemin_npz)
+            print(f"\n⏭️  {target} : {type(foret).__name__} n'est pas une forêt, conservé en .pkl")
+            continue
+
+        # Export vérifié sous un nom temporaire : seul un export dans la
+        # tolérance remplace model_<repas>.npz
+        temporaire = os.path.join(args.modeles, f'model_{target}.tmp.npz')
+        ForetCompacte.depuis_foret(foret, args.precision,
+                                   source=empreinte_fichiers([chemin_pkl])).sauvegarder(temporaire)
+        compacte = charger_foret_compacte(temporaire)
+
+        ecart = np.abs(foret.predict(X) - compacte.predict(X)).max()
+        taille_pkl = os.path.getsize(chemin_pkl)
+        taille_npz = os.path.getsize(temporaire)
+        chargement_pkl = duree_chargement(joblib.load, chemin_pkl)
+        chargement_npz = duree_chargement(charger_foret_compacte, temporaire)
+
+        if ecart <= args.tolerance:
+            os.replace(temporaire, chemin_npz)
+        else:
+            os.remove(temporaire)
+            if os.path.exists(chemin_npz):
+                os.remove(chemin_npz)
+            echec = True
+
+        statut = "✅" if ecart <= args.tolerance else "❌ (non conservé)"
+        print(f"\n{statut} {target} → {chemin_npz}")
+        print(f"   Écart maximal    : {ecart:.4f} étudiants (tolérance {args.tolerance})")
+        print(f"   Taille           : {taille_pkl / 1024:.0f} Ko → {taille_npz / 1024:.0f} Ko "
+              f"(÷{taille_pkl / taille_npz:.1f})")
+        print(f"   Chargement       : {chargement_pkl * 1000:.1f} ms → {chargement_npz * 1000:.1f} ms "
+              f"(÷{chargement_pkl / chargement_npz:.1f})")
+
+    if echec:
+        print("\n❌ Écart supérieur à la tolérance : utilisez --precision float32")
+        sys.exit(1)
+    print("\n✅ Modèles compacts prêts : MODELES_COMPACTS=1 python app_web.py")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+PRÉDICTION PAR LOT - RESTAURANT UNIVERSITAIRE
+=============================================
+Génère les prévisions de fréquentation pour une plage de dates complète
+(par exemple une année universitaire) à partir des modèles sauvegardés.
+
+UTILISATION :
+python predire_lot.py --debut 2025-09-01 --fin 2026-06-30 --feries jours_feries.csv \\
+                      --sortie previsions_2025_2026.csv
+
+Les features calendaires (weekend, jours fériés, vacances) sont dérivées du
+calendrier universitaire ; --feries permet d'ajouter des jours fériés
+supplémentaires (CSV avec une colonne 'Date' au format jj/mm/aaaa).
+La sortie est écrite au format CSV ou Parquet (selon l'extension ou --format),
+lot par lot, au fur et à mesure du calcul.
+"""
+
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from threadpoolctl import threadpool_limits
+
+from calendrier import CalendrierIndex
+from modele_compact import charger_foret_compacte, chemin_compact
+from reconciliation import reconcilier
+from stockage import StockPrevisions, empreinte_fichiers, SITE_DEFAUT
+
+REPAS = ['Petit_Dejeuner', 'Dejeuner', 'Diner']
+# Plafond de la taille de lot par défaut : au-delà, la mémoire d'un lot
+# augmente sans gain de débit, et la sortie n'est plus écrite au fil de l'eau
+TAILLE_LOT_MAX = 5000
+
+# Modèles chargés une seule fois par processus de calcul
+_models = None
+_features = None
+
+
+def charger_jours_feries(chemin):
+    """Lit des jours fériés supplémentaires (colonne 'Date', jj/mm/aaaa)."""
+    if chemin is None:
+        return pd.DatetimeIndex([])
+    feries = pd.read_csv(chemin)
+    feries.columns = feries.columns.str.strip()
+    return pd.DatetimeIndex(pd.to_datetime(feries['Date'], dayfirst=True)).normalize()
+
+
+def _chemin_modele(dossier_modeles, target, compacts=False):
+    chemin = os.path.join(dossier_modeles, f'model_{target}.pkl')
+    # Seules les forêts ont une version compacte, valable pour le .pkl actuel
+    if compacts:
+        return chemin_compact(chemin) or chemin
+    return chemin
+
+
+def _initialiser_processus(dossier_modeles, compacts=False, reconciliation=False, n_jobs=1):
+    """Charge les modèles du processus. Avec ``n_jobs=1`` (processus de
+    calcul), chaque modèle prédit sur un seul cœur : le parallélisme vient
+    des processus, pas des threads de joblib ou d'OpenMP."""
+    global _models, _features
+    if n_jobs == 1:
+        threadpool_limits(limits=1)
+    _models = {}
+    for target in REPAS + (['Total'] if reconciliation else []):
+        chemin = _chemin_modele(dossier_modeles, target, compacts)
+        if chemin.endswith('.npz'):
+            _models[target] = charger_foret_compacte(chemin)
+        else:
+            _models[target] = joblib.load(chemin)
+        if hasattr(_models[target], 'n_jobs'):
+            _models[target].n_jobs = n_jobs
+    with open(os.path.join(dossier_modeles, 'features_list.txt'), 'r') as f:
+        _features = f.read().strip().split(',')
+
+
+def predire_lot(X):
+    """Prédit les trois repas pour un lot de features déjà construit ; avec
+    le modèle du Total chargé, les prévisions du lot sont réconciliées."""
+    resultat = X.copy()
+    X_modele = X[_features]
+    valeurs = {target: model.predict(X_modele) for target, model in _models.items()}
+    if 'Total' in valeurs:
+        valeurs = reconcilier(valeurs)
+    for target in REPAS:
+        resultat[target] = np.maximum(0, valeurs[target]).astype(int)
+    resultat['Total'] = resultat[REPAS].sum(axis=1)
+    return resultat
+
+
+class EcrivainPrevisions:
+    """Écrit les lots de prévisions au fil de l'eau en CSV ou Parquet."""
+
+    def __init__(self, chemin, format_sortie):
+        self.chemin = chemin
+        self.format_sortie = format_sortie
+        self._writer = None
+        self._premier_lot = True
+        if format_sortie == 'parquet':
+            # Vérifié avant le calcul plutôt qu'à l'écriture du premier lot
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise SystemExit("❌ Le format Parquet nécessite : pip install pyarrow")
+            self._pyarrow = pyarrow
+
+    def ecrire(self, lot):
+        lot = lot.reset_index().rename(columns={'index': 'Date'})
+        if self.format_sortie == 'parquet':
+            table = self._pyarrow.Table.from_pandas(lot, preserve_index=False)
+            if self._writer is None:
+                self._writer = self._pyarrow.parquet.ParquetWriter(self.chemin, table.schema)
+            self._writer.write_table(table)
+        else:
+            lot.to_csv(self.chemin, mode='w' if self._premier_lot else 'a',
+                       header=self._premier_lot, index=False,
+                       date_format='%d/%m/%Y')
+        self._premier_lot = False
+
+    def fermer(self):
+        if self._writer is not None:
+            self._writer.close()
+
+
+def decouper(X, taille_lot):
+    for debut in range(0, len(X), taille_lot):
+        yield X.iloc[debut:debut + taille_lot]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prévisions de fréquentation par lot")
+    parser.add_argument('--debut', required=True, help="Première date (aaaa-mm-jj)")
+    parser.add_argument('--fin', required=True, help="Dernière date incluse (aaaa-mm-jj)")
+    parser.add_argument('--calendrier', default='calendrier_universitaire.csv',
+                        help="CSV des jours fériés variables et des vacances")
+    parser.add_argument('--feries', help="CSV de jours fériés supplémentaires (colonne 'Date')")
+    parser.add_argument('--sortie', default='previsions.csv', help="Fichier de sortie")
+    parser.add_argument('--format', choices=['csv', 'parquet'],
+                        help="Format de sortie (déduit de l'extension par défaut)")
+    parser.add_argument('--taille-lot', type=int,
+                        help="Nombre de jours par lot (par défaut : un lot par processus, "
+                             f"au plus {TAILLE_LOT_MAX})")
+    parser.add_argument('--processus', type=int, default=os.cpu_count(),
+                        help="Nombre de processus de calcul")
+    parser.add_argument('--modeles', default='.', help="Dossier des model_*.pkl")
+    parser.add_argument('--compacts', action='store_true',
+                        help="Utiliser les modèles compacts model_*.npz")
+    parser.add_argument('--stocker', metavar='BASE',
+                        help="Enregistrer aussi les prévisions dans la base SQLite")
+    parser.add_argument('--site', default=SITE_DEFAUT, help="Site des prévisions stockées")
+    parser.add_argument('--reconciliation', action='store_true',
+                        help="Prévoir aussi le Total et réconcilier les repas avec lui")
+    args = parser.parse_args()
+    if args.stocker and args.feries:
+        # La version stockée ne tient pas compte des jours fériés ajoutés :
+        # ces prévisions seraient servies à la place de celles de l'application
+        parser.error("--feries ne peut pas être combiné avec --stocker")
+
+    format_sortie = args.format or ('parquet' if args.sortie.endswith('.parquet') else 'csv')
+
+    print("=" * 70)
+    print(" PRÉDICTION PAR LOT - RESTAURANT UNIVERSITAIRE")
+    print("=" * 70)
+
+    ecrivain = EcrivainPrevisions(args.sortie, format_sortie)
+
+    debut_chrono = time.perf_counter()
+
+    calendrier = CalendrierIndex.charger(args.calendrier,
+                                         jours_feries=charger_jours_feries(args.feries))
+    X = calendrier.plage(args.debut, args.fin)
+    print(f"\n📅 {len(X)} jours du {X.index[0]:%d/%m/%Y} au {X.index[-1]:%d/%m/%Y}")
+    print(f"   dont {X['Jour_Ferie'].sum()} jours fériés et {X['Vacances'].sum()} jours de vacances")
+
+    # Par défaut, les jours sont répartis à parts égales entre les processus
+    taille_lot = args.taille_lot or min(math.ceil(len(X) / max(1, args.processus)), TAILLE_LOT_MAX)
+
+    if args.stocker:
+        stock = StockPrevisions(args.stocker)
+        cibles = REPAS + (['Total'] if args.reconciliation else [])
+        fichiers_version = ([_chemin_modele(args.modeles, t, args.compacts) for t in cibles]
+                            + [os.path.join(args.modeles, 'features_list.txt')])
+        if os.path.exists(args.calendrier):
+            fichiers_version.append(args.calendrier)
+        version_modele = empreinte_fichiers(fichiers_version)
+        if args.reconciliation:
+            version_modele += '-rec'
+
+    def traiter(lot):
+        ecrivain.ecrire(lot)
+        if args.stocker:
+            stock.enregistrer(args.site, version_modele, zip(
+                lot.index.strftime('%Y-%m-%d'), lot[REPAS + ['Total']].to_dict('records')
+            ))
+        return len(lot)
+
+    n_lignes = 0
+    try:
+        if args.processus > 1:
+            with ProcessPoolExecutor(max_workers=args.processus,
+                                     initializer=_initialiser_processus,
+                                     initargs=(args.modeles, args.compacts,
+                                               args.reconciliation)) as executor:
+                for lot in executor.map(predire_lot, decouper(X, taille_lot)):
+                    n_lignes += traiter(lot)
+        else:
+            _initialiser_processus(args.modeles, args.compacts, args.reconciliation, n_jobs=-1)
+            for lot in map(predire_lot, decouper(X, taille_lot)):
+                n_lignes += traiter(lot)
+    finally:
+        ecrivain.fermer()
+
+    duree = time.perf_counter() - debut_chrono
+    print(f"✅ Prévisions sauvegardées : {args.sortie} ({format_sortie})")
+    if args.stocker:
+        print(f"✅ Prévisions enregistrées dans la base : {args.stocker} (version {version_modele})")
+    print(f"⚡ {n_lignes} lignes en {duree:.2f} s — {n_lignes / duree:.0f} lignes/seconde")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""
+PROFILAGE - RESTAURANT UNIVERSITAIRE
+====================================
+Profileur par échantillonnage : un thread relève régulièrement la pile
+d'appels du thread qui traite la requête (Flask, pandas, scikit-learn...).
+
+Les piles sont agrégées par route au format « collapsed » (une pile par
+ligne, cadres séparés par ';' suivis du nombre d'échantillons), lisible par
+flamegraph.pl, speedscope ou inferno :
+
+    flamegraph.pl profils/predict_20250210.folded > predict.svg
+
+Limites connues :
+
+- seul le thread de la requête est échantillonné : le travail délégué à
+  d'autres threads (prédiction d'une forêt avec ``n_jobs=-1``, qui passe par
+  les threads de joblib) apparaît comme une attente dans joblib, sans le
+  détail des arbres ;
+- pour une réponse en flux (NDJSON), l'échantillonnage continue jusqu'à la
+  fin de l'envoi, mais seulement si le serveur parcourt le flux dans le
+  thread de la requête (serveur de développement, gunicorn en workers
+  synchrones).
+"""
+
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+# Intervalle d'échantillonnage par défaut, en secondes
+INTERVALLE_DEFAUT = 0.001
+
+
+def _nom_cadre(cadre):
+    code = cadre.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+class ProfileurEchantillonnage:
+    """Échantillonne la pile d'un thread jusqu'à l'appel de ``arreter``."""
+
+    def __init__(self, thread_id, intervalle=INTERVALLE_DEFAUT):
+        self.thread_id = thread_id
+        self.intervalle = intervalle
+        self.piles = Counter()
+        self._arret = threading.Event()
+        self._thread = threading.Thread(target=self._echantillonner, daemon=True)
+
+    def demarrer(self):
+        self._thread.start()
+        return self
+
+    def _echantillonner(self):
+        while not self._arret.wait(self.intervalle):
+            cadre = sys._current_frames().get(self.thread_id)
+            if cadre is None:
+                continue
+            pile = []
+            while cadre is not None:
+                pile.append(_nom_cadre(cadre))
+                cadre = cadre.f_back
+            self.piles[';'.join(reversed(pile))] += 1
+
+    def arreter(self):
+        self._arret.set()
+        self._thread.join()
+        return self.piles
+
+
+class ProfilsAgreges:
+    """Cumule les piles échantillonnées par route et les écrit sur disque.
+
+    Un fichier par route et par jour : ``<dossier>/<route>_<aaaammjj>.folded``.
+    Les requêtes ne font que déposer leurs piles dans une file : un thread
+    d'écriture les cumule et réécrit les fichiers modifiés de façon atomique,
+    au plus une fois par ``delai_ecriture`` secondes. Un fichier existant
+    (serveur redémarré) est repris et complété.
+    """
+
+    def __init__(self, dossier='profils', delai_ecriture=1.0):
+        self.dossier = dossier
+        self.delai_ecriture = delai_ecriture
+        self._piles = {}
+        self._file = queue.Queue()
+        self._thread = threading.Thread(target=self._ecrire_en_continu, daemon=True)
+        self._thread.start()
+        atexit.register(self.vider)
+
+    @staticmethod
+    def _lire(chemin):
+        piles = Counter()
+        if os.path.exists(chemin):
+            with open(chemin, 'r', encoding='utf-8') as f:
+                for ligne in f:
+                    pile, _, nombre = ligne.rstrip('\n').rpartition(' ')
+                    piles[pile] += int(nombre)
+        return piles
+
+    def chemin(self, route):
+        return os.path.join(self.dossier, f'{route}_{datetime.now():%Y%m%d}.folded')
+
+    def ajouter(self, route, piles):
+        """Met en file les piles d'une requête ; renvoie le fichier qui les recevra."""
+        chemin = self.chemin(route)
+        self._file.put((route, chemin, piles))
+        return chemin
+
+    def vider(self):
+        """Attend que toutes les piles en file soient écrites sur disque."""
+        self._file.join()
+
+    def _cumuler(self, route, chemin, piles):
+        chemin_courant, cumul = self._piles.get(route, (None, None))
+        if chemin_courant != chemin:
+            cumul = self._lire(chemin)
+            self._piles[route] = (chemin, cumul)
+        cumul.update(piles)
+
+    def _ecrire(self, chemin, cumul):
+        os.makedirs(self.dossier, exist_ok=True)
+        temporaire = chemin + '.tmp'
+        with open(temporaire, 'w', encoding='utf-8') as f:
+            for pile, nombre in cumul.most_common():
+                f.write(f'{pile} {nombre}\n')
+        os.replace(temporaire, chemin)
+
+    def _ecrire_en_continu(self):
+        while True:
+            # Toutes les requêtes arrivées depuis la dernière écriture
+            lot = [self._file.get()]
+            while True:
+                try:
+                    lot.append(self._file.get_nowait())
+                except queue.Empty:
+                    break
+
+            routes = set()
+            try:
+                for route, chemin, piles in lot:
+                    self._cumuler(route, chemin, piles)
+                    routes.add(route)
+                for route in routes:
+                    self._ecrire(*self._piles[route])
+            except OSError as e:
+                print(f"⚠️  Écriture des profils impossible : {e}")
+            finally:
+                for _ in lot:
+                    self._file.task_done()
+            time.sleep(self.delai_ecriture)
@@ -0,0 +1,32 @@
+"""
+RÉCONCILIATION HIÉRARCHIQUE - RESTAURANT UNIVERSITAIRE
+======================================================
+Le Total de la journée est prévu par son propre modèle (model_Total.pkl),
+en plus des trois repas. Les quatre prévisions sont ensuite rendues
+cohérentes (repas dont la somme vaut le Total) par projection des moindres
+carrés ordinaires sur la hiérarchie :
+
+    ŷ_réconcilié = S (S'S)⁻¹ S' ŷ      avec ŷ = [Total, Petit_Dejeuner, Dejeuner, Diner]
+
+La projection est une matrice 4 x 4 constante, appliquée à tout un lot de
+prévisions en un seul produit matriciel. Ici elle revient à répartir
+l'écart entre le Total prévu et la somme des repas à parts égales entre les
+quatre séries.
+"""
+
+import numpy as np
+
+REPAS = ['Petit_Dejeuner', 'Dejeuner', 'Diner']
+SERIES = ['Total'] + REPAS
+
+# Matrice de sommation : chaque série en fonction des repas
+S = np.vstack([np.ones((1, len(REPAS))), np.eye(len(REPAS))])
+PROJECTION = S @ np.linalg.inv(S.T @ S) @ S.T
+
+
+def reconcilier(previsions):
+    """Réconcilie un lot de prévisions ``{série: tableau (n_lignes,)}``
+    contenant le Total et les trois repas ; renvoie le même format."""
+    Y = np.column_stack([np.asarray(previsions[serie], dtype=float) for serie in SERIES])
+    reconciliees = Y @ PROJECTION.T
+    return {serie: reconciliees[:, i] for i, serie in enumerate(SERIES)}
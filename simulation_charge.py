@@ -0,0 +1,281 @@
+"""
+SIMULATION DE CHARGE - RESTAURANT UNIVERSITAIRE
+===============================================
+Démarre app_web.py en local (dans un processus séparé) et lui envoie un
+trafic synthétique sur /api/predire, à plusieurs niveaux de concurrence :
+
+- 'jour'        : un jour au hasard de l'année universitaire
+- 'intervalles' : un jour au hasard, avec intervalles de prédiction
+- 'plage'       : une plage de 7 à 62 jours
+- 'chaud'       : un jour parmi quelques dates très demandées (examens...)
+
+Pour chaque niveau : débit, latences (p50, p95, p99, par type de requête),
+taux d'erreur et taux de succès de la base des prévisions (lu sur /metrics).
+Les résultats sont sauvegardés au format de benchmark.py, avec le mode du
+serveur, pour comparer les configurations entre elles.
+
+Chaque niveau démarre son propre serveur, avec une base des prévisions
+temporaire vide (jamais previsions.db ; ``--env STOCK_PREVISIONS=`` la
+désactive), et envoie sa propre suite de requêtes (graine + n° du niveau) :
+un niveau ne profite pas des prévisions stockées par les précédents. Avec
+--externe, le serveur et sa base sont partagés ; seules les suites diffèrent.
+Le taux de succès n'est lu que sur le processus qui répond à /metrics
+(un seul worker avec gunicorn -w N).
+
+UTILISATION :
+python simulation_charge.py --mode standard
+python simulation_charge.py --mode compacts --env MODELES_COMPACTS=1 \\
+       --comparer charges/charge_standard_20250210_101500.json
+python simulation_charge.py --mode gunicorn \\
+       --commande "gunicorn -w 4 -b 127.0.0.1:{port} app_web:app"
+"""
+
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from benchmark import Resultats, comparer
+
+CONCURRENCES = [1, 8, 32]
+MELANGE_DEFAUT = 'jour=50,intervalles=10,plage=20,chaud=20'
+
+COMMANDE_DEFAUT = (f"{shlex.quote(sys.executable)} -c "
+                   "\"import app_web; app_web.app.run(host='127.0.0.1', port={port}, threaded=True)\"")
+
+
+def lire_melange(texte):
+    """'jour=50,plage=20' → {'jour': 50.0, 'plage': 20.0}"""
+    melange = {}
+    for element in texte.split(','):
+        nom, _, poids = element.partition('=')
+        if nom.strip() not in ('jour', 'intervalles', 'plage', 'chaud'):
+            raise ValueError(f"Type de requête inconnu : {nom}")
+        melange[nom.strip()] = float(poids)
+    return melange
+
+
+def generer_requetes(nombre, melange, graine=42, debut='2025-09-01', horizon=300,
+                     jours_plage=(7, 62), n_chaudes=10):
+    """Liste reproductible de couples (type, corps JSON encodé)."""
+    generateur = random.Random(graine)
+    premier = date.fromisoformat(debut)
+
+    def jour_aleatoire():
+        return premier + timedelta(days=generateur.randrange(horizon))
+
+    chaudes = [jour_aleatoire() for _ in range(n_chaudes)]
+    requetes = []
+    for type_requete in generateur.choices(list(melange), weights=list(melange.values()), k=nombre):
+        if type_requete == 'plage':
+            jour = jour_aleatoire()
+            fin = jour + timedelta(days=generateur.randint(*jours_plage) - 1)
+            corps = {'date_debut': jour.isoformat(), 'date_fin': fin.isoformat()}
+        elif type_requete == 'chaud':
+            corps = {'date': generateur.choice(chaudes).isoformat()}
+        else:
+            corps = {'date': jour_aleatoire().isoformat()}
+            if type_requete == 'intervalles':
+                corps['intervalles'] = True
+        requetes.append((type_requete, json.dumps(corps).encode('utf-8')))
+    return requetes
+
+
+def demarrer_serveur(commande, port, env, journal):
+    environnement = {**os.environ, **env}
+    sortie = open(journal, 'w', encoding='utf-8')
+    processus = subprocess.Popen(shlex.split(commande.format(port=port)), env=environnement,
+                                 stdout=sortie, stderr=subprocess.STDOUT)
+    sortie.close()
+    return processus
+
+
+def attendre_serveur(hote, port, processus=None, delai=120):
+    """Attend que /metrics réponde (chargement des modèles compris)."""
+    limite = time.time() + delai
+    while time.time() < limite:
+        if processus is not None and processus.poll() is not None:
+            raise RuntimeError(f"Le serveur s'est arrêté (code {processus.returncode})")
+        try:
+            with urllib.request.urlopen(f'http://{hote}:{port}/metrics', timeout=2) as reponse:
+                if reponse.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Le serveur ne répond pas après {delai} s")
+
+
+def lire_cache_previsions(hote, port):
+    """Compteurs (succes, echecs) de la base des prévisions sur /metrics,
+    None si le serveur n'en a pas."""
+    with urllib.request.urlopen(f'http://{hote}:{port}/metrics', timeout=10) as reponse:
+        texte = reponse.read().decode('utf-8')
+    compteurs = {}
+    for ligne in texte.splitlines():
+        for resultat in ('succes', 'echecs'):
+            prefixe = f'cache_requetes_total{{cache="previsions",resultat="{resultat}"}} '
+            if ligne.startswith(prefixe):
+                compteurs[resultat] = float(ligne[len(prefixe):])
+    return (compteurs['succes'], compteurs['echecs']) if len(compteurs) == 2 else None
+
+
+def executer_niveau(hote, port, requetes, concurrence, duree=None):
+    """Envoie les requêtes en boucle pendant ``duree`` secondes (ou chacune
+    une seule fois sans durée) depuis ``concurrence`` clients ; renvoie les
+    mesures et la durée réelle."""
+    compteur = itertools.count()
+    fin = time.perf_counter() + duree if duree is not None else None
+    entetes = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'}
+
+    def client():
+        connexion = http.client.HTTPConnection(hote, port, timeout=60)
+        mesures = []
+        while True:
+            i = next(compteur)
+            if (time.perf_counter() >= fin) if fin is not None else (i >= len(requetes)):
+                break
+            type_requete, corps = requetes[i % len(requetes)]
+            debut = time.perf_counter()
+            try:
+                connexion.request('POST', '/api/predire', corps, entetes)
+                reponse = connexion.getresponse()
+                reponse.read()
+                succes = reponse.status == 200
+            except (OSError, http.client.HTTPException):
+                connexion.close()
+                succes = False
+            mesures.append((type_requete, time.perf_counter() - debut, succes))
+        connexion.close()
+        return mesures
+
+    debut = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrence) as executor:
+        clients = [executor.submit(client) for _ in range(concurrence)]
+        mesures = [mesure for c in clients for mesure in c.result()]
+    return mesures, time.perf_counter() - debut
+
+
+def enregistrer_niveau(resultats, concurrence, mesures, duree, cache=None):
+    """``cache`` : (succes, echecs) de la base des prévisions pendant le niveau."""
+    prefixe = f'charge.concurrence_{concurrence}'
+    durees = np.array([d for _, d, _ in mesures])
+    erreurs = sum(1 for _, _, succes in mesures if not succes)
+
+    resultats.ajouter(f'{prefixe}.debit', len(mesures) / duree, 'requêtes/s', meilleur='haut')
+    resultats.latences(prefixe, durees)
+    resultats.ajouter(f'{prefixe}.taux_erreur', 100 * erreurs / max(1, len(mesures)), '%')
+    if cache is not None and sum(cache):
+        resultats.ajouter(f'{prefixe}.taux_succes_stock', 100 * cache[0] / sum(cache), '%',
+                          meilleur='haut')
+    for type_requete in sorted({t for t, _, _ in mesures}):
+        resultats.latences(f'{prefixe}.{type_requete}',
+                           np.array([d for t, d, _ in mesures if t == type_requete]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation de charge sur /api/predire")
+    parser.add_argument('--mode', default='standard',
+                        help="Nom de la configuration du serveur testée")
+    parser.add_argument('--env', action='append', default=[], metavar='CLE=VALEUR',
+                        help="Variable d'environnement du serveur (répétable)")
+    parser.add_argument('--commande', default=COMMANDE_DEFAUT,
+                        help="Commande de lancement du serveur ({port} est remplacé)")
+    parser.add_argument('--externe', action='store_true',
+                        help="Utiliser un serveur déjà démarré sur --hote:--port")
+    parser.add_argument('--hote', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--concurrences', default=','.join(map(str, CONCURRENCES)),
+                        help="Niveaux de concurrence, séparés par des virgules")
+    parser.add_argument('--duree', type=float, default=15, help="Durée de chaque niveau (s)")
+    parser.add_argument('--melange', default=MELANGE_DEFAUT,
+                        help="Poids des types de requêtes (jour, intervalles, plage, chaud)")
+    parser.add_argument('--echauffement', type=int, default=50,
+                        help="Requêtes envoyées avant les mesures")
+    parser.add_argument('--graine', type=int, default=42)
+    parser.add_argument('--sortie', help="Fichier JSON des résultats")
+    parser.add_argument('--comparer', help="Résultats de référence (autre mode ou exécution)")
+    parser.add_argument('--seuil', type=float, default=0.10,
+                        help="Dégradation relative signalée lors de la comparaison")
+    args = parser.parse_args()
+
+    env = dict(variable.split('=', 1) for variable in args.env)
+    concurrences = [int(c) for c in args.concurrences.split(',')]
+    horodatage = f"{datetime.now():%Y%m%d_%H%M%S}"
+    sortie = args.sortie or f"charges/charge_{args.mode}_{horodatage}.json"
+
+    print("=" * 70)
+    print(f" SIMULATION DE CHARGE - mode '{args.mode}'")
+    print("=" * 70)
+
+    melange = lire_melange(args.melange)
+    # Échauffement sur sa propre suite, pour ne pas préremplir la base
+    echauffement = generer_requetes(args.echauffement, melange, args.graine)
+    stock_temporaire = not args.externe and 'STOCK_PREVISIONS' not in env
+    if not args.externe:
+        os.makedirs('charges', exist_ok=True)
+
+    resultats = Resultats()
+    for numero, concurrence in enumerate(concurrences, 1):
+        requetes = generer_requetes(20000, melange, args.graine + numero)
+        processus = None
+        dossier_stock = None
+        try:
+            if not args.externe:
+                if stock_temporaire:
+                    dossier_stock = tempfile.mkdtemp(prefix='charge_')
+                    env['STOCK_PREVISIONS'] = os.path.join(dossier_stock, 'previsions.db')
+                journal = f"charges/serveur_{args.mode}_{horodatage}_c{concurrence}.log"
+                print(f"\n🚀 Démarrage du serveur (journal : {journal})")
+                processus = demarrer_serveur(args.commande, args.port, env, journal)
+            attendre_serveur(args.hote, args.port, processus)
+            print(f"✅ Serveur prêt sur http://{args.hote}:{args.port}")
+            executer_niveau(args.hote, args.port, echauffement, 1)
+
+            print(f"🌐 Concurrence {concurrence} pendant {args.duree:.0f} s...")
+            avant = lire_cache_previsions(args.hote, args.port)
+            mesures, duree = executer_niveau(args.hote, args.port, requetes, concurrence, args.duree)
+            apres = lire_cache_previsions(args.hote, args.port)
+            cache = (apres[0] - avant[0], apres[1] - avant[1]) if avant and apres else None
+            enregistrer_niveau(resultats, concurrence, mesures, duree, cache)
+            if cache is not None and sum(cache):
+                print(f"   Base des prévisions : {100 * cache[0] / sum(cache):.1f} % de succès")
+        finally:
+            if processus is not None:
+                processus.terminate()
+                try:
+                    processus.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    processus.kill()
+            if dossier_stock is not None:
+                shutil.rmtree(dossier_stock, ignore_errors=True)
+
+    resultats.sauvegarder(sortie, contexte={
+        'mode': args.mode,
+        'commande': args.commande if not args.externe else None,
+        'env': env,
+        # Base des prévisions du serveur (inconnue pour un serveur externe)
+        'stock_previsions': bool(env['STOCK_PREVISIONS']) if not args.externe else None,
+        'melange': melange,
+        'duree_niveau': args.duree,
+        'graine': args.graine
+    })
+
+    if args.comparer and comparer(resultats, args.comparer, args.seuil):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+STOCKAGE DES PRÉVISIONS - RESTAURANT UNIVERSITAIRE
+==================================================
+Base SQLite locale qui conserve chaque prévision (par site, date et version
+des modèles) ainsi que la fréquentation réellement observée, pour :
+
+- servir à nouveau une prévision déjà calculée sans réinterroger les modèles
+- comparer les prévisions à la fréquentation réelle sur une période
+
+UTILISATION :
+python stockage.py importer                         # fréquentation réelle du CSV
+python stockage.py comparer --debut 2025-01-01 --fin 2025-06-30
+"""
+
+import argparse
+import hashlib
+import sqlite3
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+REPAS = ['Petit_Dejeuner', 'Dejeuner', 'Diner']
+COLONNES = REPAS + ['Total']
+
+SITE_DEFAUT = 'principal'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS previsions (
+    site            TEXT NOT NULL,
+    date            TEXT NOT NULL,
+    version_modele  TEXT NOT NULL,
+    petit_dejeuner  INTEGER NOT NULL,
+    dejeuner        INTEGER NOT NULL,
+    diner           INTEGER NOT NULL,
+    total           INTEGER NOT NULL,
+    cree_le         TEXT NOT NULL,
+    PRIMARY KEY (site, version_modele, date)
+);
+CREATE INDEX IF NOT EXISTS idx_previsions_date ON previsions (date, site);
+
+CREATE TABLE IF NOT EXISTS frequentation_reelle (
+    site            TEXT NOT NULL,
+    date            TEXT NOT NULL,
+    petit_dejeuner  INTEGER NOT NULL,
+    dejeuner        INTEGER NOT NULL,
+    diner           INTEGER NOT NULL,
+    total           INTEGER NOT NULL,
+    PRIMARY KEY (site, date)
+);
+"""
+
+
+def empreinte_fichiers(chemins):
+    """Version des modèles : empreinte SHA-1 (12 caractères) des fichiers."""
+    empreinte = hashlib.sha1()
+    for chemin in chemins:
+        with open(chemin, 'rb') as f:
+            for bloc in iter(lambda: f.read(1 << 20), b''):
+                empreinte.update(bloc)
+    return empreinte.hexdigest()[:12]
+
+
+class StockPrevisions:
+    """Accès à la base des prévisions (une connexion SQLite par thread).
+
+    ``statistiques`` compte les prévisions servies depuis la base ('succes')
+    et celles qu'il a fallu calculer ('echecs').
+    """
+
+    def __init__(self, chemin='previsions.db'):
+        self.chemin = chemin
+        self._local = threading.local()
+        self.statistiques = {'succes': 0, 'echecs': 0}
+        self._verrou_statistiques = threading.Lock()
+        with self._connexion() as connexion:
+            connexion.executescript(SCHEMA)
+
+    def _compter(self, resultat, nombre):
+        with self._verrou_statistiques:
+            self.statistiques[resultat] += nombre
+
+    def _connexion(self):
+        connexion = getattr(self._local, 'connexion', None)
+        if connexion is None:
+            connexion = sqlite3.connect(self.chemin)
+            connexion.execute('PRAGMA journal_mode=WAL')
+            connexion.execute('PRAGMA synchronous=NORMAL')
+            self._local.connexion = connexion
+        return connexion
+
+    def lire(self, site, version_modele, debut, fin):
+        """Prévisions stockées entre deux dates 'aaaa-mm-jj' : {date: ligne}."""
+        curseur = self._connexion().execute(
+            "SELECT date, petit_dejeuner, dejeuner, diner, total FROM previsions "
+            "WHERE site = ? AND version_modele = ? AND date BETWEEN ? AND ?",
+            (site, version_modele, debut, fin)
+        )
+        return {date: dict(zip(COLONNES, valeurs)) for date, *valeurs in curseur}
+
+    def enregistrer(self, site, version_modele, previsions):
+        """Insère ou remplace en une transaction des couples (date, ligne)."""
+        cree_le = datetime.now().isoformat(timespec='seconds')
+        with self._connexion() as connexion:
+            connexion.executemany(
+                "INSERT OR REPLACE INTO previsions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(site, date, version_modele, *(int(ligne[c]) for c in COLONNES), cree_le)
+                 for date, ligne in previsions]
+            )
+
+    def lire_ou_calculer(self, site, version_modele, dates, calculer):
+        """Lecture à travers la base : seules les dates absentes sont
+        calculées, par un unique appel ``calculer(positions)`` qui renvoie
+        leurs lignes, puis enregistrées."""
+        connues = self.lire(site, version_modele, min(dates), max(dates))
+        manquantes = [i for i, date in enumerate(dates) if date not in connues]
+        self._compter('succes', len(dates) - len(manquantes))
+        self._compter('echecs', len(manquantes))
+
+        if manquantes:
+            nouvelles = [(dates[i], ligne) for i, ligne in zip(manquantes, calculer(manquantes))]
+            self.enregistrer(site, version_modele, nouvelles)
+            connues.update(nouvelles)
+        return [dict(connues[date]) for date in dates]
+
+    def enregistrer_reel(self, site, frequentations):
+        """Insère ou remplace des couples (date, ligne) de fréquentation réelle."""
+        with self._connexion() as connexion:
+            connexion.executemany(
+                "INSERT OR REPLACE INTO frequentation_reelle VALUES (?, ?, ?, ?, ?, ?)",
+                [(site, date, *(int(ligne[c]) for c in COLONNES))
+                 for date, ligne in frequentations]
+            )
+
+    def lire_reel(self, site=SITE_DEFAUT):
+        """Toute la fréquentation réelle d'un site : liste de couples (date, ligne)."""
+        curseur = self._connexion().execute(
+            "SELECT date, petit_dejeuner, dejeuner, diner, total FROM frequentation_reelle "
+            "WHERE site = ? ORDER BY date", (site,)
+        )
+        return [(date, dict(zip(COLONNES, valeurs))) for date, *valeurs in curseur]
+
+    def comparer(self, debut, fin, site=SITE_DEFAUT, version_modele=None):
+        """Prévisions et fréquentation réelle jour par jour sur [debut, fin].
+
+        Sans ``version_modele``, la prévision la plus récente de chaque jour
+        est retenue.
+        """
+        requete = """
+            SELECT p.date, p.version_modele,
+                   p.petit_dejeuner, p.dejeuner, p.diner, p.total,
+                   r.petit_dejeuner, r.dejeuner, r.diner, r.total
+            FROM previsions p
+            JOIN frequentation_reelle r ON r.site = p.site AND r.date = p.date
+            WHERE p.site = ? AND p.date BETWEEN ? AND ?
+        """
+        parametres = [site, debut, fin]
+        if version_modele:
+            requete += " AND p.version_modele = ?"
+            parametres.append(version_modele)
+        requete += " ORDER BY p.date, p.cree_le"
+
+        lignes = {}
+        for date, version, *valeurs in self._connexion().execute(requete, parametres):
+            prevue, reelle = valeurs[:4], valeurs[4:]
+            lignes[date] = {
+                'Date': date,
+                'version_modele': version,
+                'prevision': dict(zip(COLONNES, prevue)),
+                'reel': dict(zip(COLONNES, reelle)),
+                'erreur': {c: p - r for c, p, r in zip(COLONNES, prevue, reelle)}
+            }
+        return list(lignes.values())
+
+
+def lire_frequentation_csv(chemin='Data base (csv).csv'):
+    """Fréquentation réelle du dataset : liste de couples (date, ligne)."""
+    df = pd.read_csv(chemin)
+    df.columns = df.columns.str.strip()
+    df = df.rename(columns={
+        'les étudiants arrivent au Petit Déjeuner': 'Petit_Dejeuner',
+        'les étudiants arrivent au Déjeuner': 'Dejeuner',
+        'les étudiants arrivent au dinner': 'Diner'
+    })
+    df['Date'] = pd.to_datetime(df['Date'], format='%d/%m/%Y', errors='coerce')
+    df = df.dropna(subset=['Date'])
+    return [(date.strftime('%Y-%m-%d'), ligne)
+            for date, ligne in zip(df['Date'], df[COLONNES].to_dict('records'))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Base des prévisions")
+    parser.add_argument('--base', default='previsions.db', help="Fichier SQLite")
+    parser.add_argument('--site', default=SITE_DEFAUT)
+    sous_commandes = parser.add_subparsers(dest='commande', required=True)
+
+    importer = sous_commandes.add_parser('importer', help="Importer la fréquentation réelle")
+    importer.add_argument('--csv', default='Data base (csv).csv')
+
+    comparer = sous_commandes.add_parser('comparer', help="Comparer prévisions et réel")
+    comparer.add_argument('--debut', required=True)
+    comparer.add_argument('--fin', required=True)
+    comparer.add_argument('--version', help="Version des modèles")
+    args = parser.parse_args()
+
+    stock = StockPrevisions(args.base)
+
+    if args.commande == 'importer':
+        frequentations = lire_frequentation_csv(args.csv)
+        stock.enregistrer_reel(args.site, frequentations)
+        print(f"✅ {len(frequentations)} jours de fréquentation réelle importés dans {args.base}")
+        return
+
+    lignes = stock.comparer(args.debut, args.fin, args.site, args.version)
+    if not lignes:
+        print("⚠️  Aucune prévision avec fréquentation réelle sur cette période")
+        return
+    print(f"\n📊 Prévisions vs réel : {len(lignes)} jours")
+    print("-" * 70)
+    for colonne in COLONNES:
+        mae = sum(abs(ligne['erreur'][colonne]) for ligne in lignes) / len(lignes)
+        print(f"   {colonne:<15}: MAE {mae:.1f} étudiants")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,257 @@
+"""
+SURVEILLANCE DES MODÈLES - RESTAURANT UNIVERSITAIRE
+===================================================
+Suivi en ligne de la qualité des prévisions à partir de la fréquentation
+réelle, au fur et à mesure qu'elle est saisie :
+
+- MAE glissante par repas sur les derniers jours observés
+- dérive des distributions (PSI) des features et des fréquentations par
+  rapport aux données d'entraînement (``reference_surveillance.json``,
+  produit par train_model.py)
+- réentraînement automatique (optionnel) lorsque la MAE dépasse son seuil,
+  sur le CSV complété par la fréquentation réelle de la base ; l'application
+  doit ensuite être redémarrée pour servir les nouveaux modèles
+
+La mémoire utilisée est constante : une fenêtre fixe d'erreurs par repas et
+des histogrammes à décroissance exponentielle.
+"""
+
+import json
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+REPAS = ['Petit_Dejeuner', 'Dejeuner', 'Diner']
+
+# Seuils usuels du PSI : < 0.1 stable, 0.1 - 0.25 à surveiller, > 0.25 dérive
+SEUIL_PSI = 0.25
+
+
+def construire_reference(df, colonnes, n_classes=10):
+    """Classes (déciles) et proportions de référence de chaque colonne."""
+    reference = {}
+    for colonne in colonnes:
+        valeurs = df[colonne].to_numpy(dtype=float)
+        if np.isnan(valeurs).any():
+            raise ValueError(f"Référence de surveillance : valeurs manquantes dans '{colonne}'")
+        bornes = np.unique(np.quantile(valeurs, np.linspace(0, 1, n_classes + 1))[1:-1])
+        comptes = np.bincount(np.searchsorted(bornes, valeurs, side='right'),
+                              minlength=len(bornes) + 1)
+        reference[colonne] = {
+            'bornes': bornes.tolist(),
+            'proportions': (comptes / comptes.sum()).tolist()
+        }
+    return reference
+
+
+class DistributionGlissante:
+    """Histogramme à décroissance exponentielle comparé à une référence.
+
+    Chaque nouvelle observation pèse 1 et le poids des anciennes est divisé
+    par deux tous les ``demi_vie`` jours observés.
+    """
+
+    def __init__(self, bornes, proportions, demi_vie=60):
+        self.bornes = np.asarray(bornes, dtype=float)
+        self.reference = np.asarray(proportions, dtype=float)
+        self.comptes = np.zeros(len(self.reference))
+        self.decroissance = 0.5 ** (1 / demi_vie)
+
+    def ajouter(self, valeur):
+        self.comptes *= self.decroissance
+        self.comptes[np.searchsorted(self.bornes, valeur, side='right')] += 1
+
+    def psi(self, epsilon=1e-4):
+        """Population Stability Index entre l'histogramme et la référence."""
+        total = self.comptes.sum()
+        if total == 0:
+            return 0.0
+        observees = np.clip(self.comptes / total, epsilon, None)
+        attendues = np.clip(self.reference, epsilon, None)
+        return float(np.sum((observees - attendues) * np.log(observees / attendues)))
+
+
+class MAEGlissante:
+    """Erreur absolue moyenne sur les ``fenetre`` dernières observations."""
+
+    def __init__(self, fenetre=30):
+        self.erreurs = deque(maxlen=fenetre)
+        self.somme = 0.0
+
+    def ajouter(self, erreur):
+        if len(self.erreurs) == self.erreurs.maxlen:
+            self.somme -= self.erreurs[0]
+        self.erreurs.append(abs(erreur))
+        self.somme += abs(erreur)
+
+    def __len__(self):
+        return len(self.erreurs)
+
+    @property
+    def valeur(self):
+        return self.somme / len(self.erreurs) if self.erreurs else None
+
+
+class Reentrainement:
+    """Lance ``python train_model.py --base <base>`` en arrière-plan, au plus
+    une fois par ``delai_minimal`` secondes, et journalise la sortie.
+
+    L'entraînement utilise le CSV complété par la fréquentation réelle
+    saisie dans la base. Les nouveaux modèles remplacent les fichiers
+    model_*.pkl mais l'application en cours continue de servir les anciens :
+    ``etat()['redemarrage_requis']`` passe à True une fois l'entraînement
+    réussi. L'heure du dernier lancement est conservée dans ``fichier_etat``,
+    pour que le délai minimal survive aux redémarrages.
+    """
+
+    def __init__(self, base, delai_minimal=7 * 24 * 3600, journal='reentrainement.log',
+                 fichier_etat='reentrainement.json'):
+        self.base = base
+        self.delai_minimal = delai_minimal
+        self.journal = journal
+        self.fichier_etat = fichier_etat
+        self.processus = None
+        self.dernier_lancement = None
+        self.raison = None
+        self._verrou = threading.Lock()
+        try:
+            with open(fichier_etat, 'r', encoding='utf-8') as f:
+                etat = json.load(f)
+            self.dernier_lancement, self.raison = etat['dernier_lancement'], etat['raison']
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+    def en_cours(self):
+        return self.processus is not None and self.processus.poll() is None
+
+    def declencher(self, raison):
+        # Vérification et lancement sous verrou : un seul entraînement à la fois
+        with self._verrou:
+            if self.en_cours():
+                return False
+            if self.dernier_lancement and time.time() - self.dernier_lancement < self.delai_minimal:
+                return False
+            with open(self.journal, 'a', encoding='utf-8') as f:
+                f.write(f"\n=== {datetime.now():%Y-%m-%d %H:%M:%S} — {raison}\n")
+            sortie = open(self.journal, 'a', encoding='utf-8')
+            self.processus = subprocess.Popen([sys.executable, 'train_model.py', '--base', self.base],
+                                              stdout=sortie, stderr=subprocess.STDOUT)
+            sortie.close()
+            self.dernier_lancement = time.time()
+            self.raison = raison
+            with open(self.fichier_etat, 'w', encoding='utf-8') as f:
+                json.dump({'dernier_lancement': self.dernier_lancement, 'raison': raison}, f)
+            return True
+
+    def etat(self):
+        code_retour = self.processus.poll() if self.processus is not None else None
+        return {
+            'en_cours': self.en_cours(),
+            'dernier_lancement': (datetime.fromtimestamp(self.dernier_lancement).isoformat(timespec='seconds')
+                                  if self.dernier_lancement else None),
+            'raison': self.raison,
+            'code_retour': code_retour,
+            'redemarrage_requis': code_retour == 0
+        }
+
+
+class Surveillance:
+    """Agrège les observations (features du jour, prévision, réel) et
+    signale les dépassements de seuils.
+
+    Une alerte est levée quand la MAE glissante d'un repas dépasse
+    ``seuil_mae_relatif`` fois sa MAE de test à l'entraînement. Le PSI est
+    seulement rapporté (``derives`` quand il dépasse ``seuil_psi``) : les
+    features calendaires comme les fréquentations varient naturellement avec
+    la saison (vacances, examens), et un réentraînement ne changerait pas la
+    référence.
+    """
+
+    def __init__(self, reference=None, fenetre_mae=30, seuil_mae_relatif=1.5,
+                 seuil_psi=SEUIL_PSI, min_observations=14, reentrainement=None):
+        self.reference = reference or {}
+        self.seuil_mae_relatif = seuil_mae_relatif
+        self.seuil_psi = seuil_psi
+        self.min_observations = min_observations
+        self.reentrainement = reentrainement
+        self.mae = {repas: MAEGlissante(fenetre_mae) for repas in REPAS}
+        self.distributions = {
+            colonne: DistributionGlissante(ref['bornes'], ref['proportions'])
+            for colonne, ref in self.reference.get('distributions', {}).items()
+        }
+        self.observations = 0
+        self.derniere_date = None
+        self._verrou = threading.Lock()
+
+    @classmethod
+    def charger(cls, chemin='reference_surveillance.json', **kwargs):
+        try:
+            with open(chemin, 'r', encoding='utf-8') as f:
+                reference = json.load(f)
+        except FileNotFoundError:
+            print(f"⚠️  Référence '{chemin}' introuvable : dérive non calculée "
+                  "(relancez train_model.py)")
+            reference = None
+        return cls(reference, **kwargs)
+
+    def observer(self, date, features, reel, prevision=None, reentrainer=True):
+        """Ajoute un jour observé ; ``features`` et ``reel`` sont des dicts.
+        Sans ``reentrainer`` (reprise de l'historique), les alertes ne
+        déclenchent pas de réentraînement."""
+        with self._verrou:
+            self.observations += 1
+            self.derniere_date = max(date, self.derniere_date or date)
+            for colonne, distribution in self.distributions.items():
+                valeur = reel.get(colonne, features.get(colonne))
+                if valeur is not None:
+                    distribution.ajouter(valeur)
+            if prevision is not None:
+                for repas in REPAS:
+                    self.mae[repas].ajouter(prevision[repas] - reel[repas])
+
+        alertes = self.alertes()
+        if alertes and reentrainer and self.reentrainement is not None:
+            self.reentrainement.declencher('; '.join(alertes))
+        return alertes
+
+    def alertes(self):
+        alertes = []
+        mae_reference = self.reference.get('mae_test', {})
+        with self._verrou:
+            for repas, mae in self.mae.items():
+                if len(mae) < self.min_observations or repas not in mae_reference:
+                    continue
+                limite = self.seuil_mae_relatif * mae_reference[repas]
+                if mae.valeur > limite:
+                    alertes.append(f"MAE {repas} {mae.valeur:.1f} > {limite:.1f}")
+        return alertes
+
+    def derives(self):
+        """Distributions dont le PSI dépasse le seuil (information seulement)."""
+        with self._verrou:
+            if self.observations < self.min_observations:
+                return []
+            psi = {colonne: distribution.psi() for colonne, distribution in self.distributions.items()}
+        return [f"PSI {colonne} {valeur:.2f} > {self.seuil_psi}"
+                for colonne, valeur in psi.items() if valeur > self.seuil_psi]
+
+    def etat(self):
+        with self._verrou:
+            etat = {
+                'observations': self.observations,
+                'derniere_date': self.derniere_date,
+                'mae_glissante': {repas: mae.valeur for repas, mae in self.mae.items()},
+                'mae_reference': self.reference.get('mae_test', {}),
+                'psi': {colonne: round(distribution.psi(), 4)
+                        for colonne, distribution in self.distributions.items()}
+            }
+        etat['derives'] = self.derives()
+        etat['alertes'] = self.alertes()
+        if self.reentrainement is not None:
+            etat['reentrainement'] = self.reentrainement.etat()
+        return etat
@@ -0,0 +1,59 @@
+"""Fixtures communes : modèles entraînés une seule fois pour la session."""
+
+import os
+import shutil
+import sys
+
+import pytest
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RACINE)
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+DONNEES = os.path.join(RACINE, 'Data base (csv).csv')
+
+
+@pytest.fixture(scope='session')
+def dossier_modeles(tmp_path_factory):
+    """Dossier où le pipeline complet a été exécuté (modèles, rapports)."""
+    import train_model
+
+    dossier = tmp_path_factory.mktemp('modeles')
+    shutil.copy(os.path.join(RACINE, 'calendrier_universitaire.csv'), dossier)
+    repertoire_initial = os.getcwd()
+    os.chdir(dossier)
+    try:
+        models, metrics, durees_etapes = train_model.executer_pipeline(DONNEES, str(dossier))
+    finally:
+        os.chdir(repertoire_initial)
+    return {'dossier': dossier, 'models': models, 'metrics': metrics,
+            'durees_etapes': durees_etapes}
+
+
+@pytest.fixture(scope='session')
+def app_web(dossier_modeles, tmp_path_factory):
+    """Module app_web chargé depuis le dossier des modèles entraînés, avec
+    une base des prévisions temporaire et des jetons de profilage et de saisie."""
+    base = tmp_path_factory.mktemp('base') / 'previsions.db'
+    variables = {'STOCK_PREVISIONS': str(base), 'PROFILAGE_JETON': 'jeton-test',
+                 'INGESTION_JETON': 'jeton-saisie',
+                 'PROFILAGE_DOSSIER': str(tmp_path_factory.mktemp('profils'))}
+    anciennes = {cle: os.environ.get(cle) for cle in variables}
+    os.environ.update(variables)
+    repertoire_initial = os.getcwd()
+    os.chdir(dossier_modeles['dossier'])
+    try:
+        import app_web
+        yield app_web
+    finally:
+        os.chdir(repertoire_initial)
+        for cle, valeur in anciennes.items():
+            if valeur is None:
+                os.environ.pop(cle, None)
+            else:
+                os.environ[cle] = valeur
+
+
+@pytest.fixture
+def client(app_web):
+    return app_web.app.test_client()
@@ -0,0 +1,157 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def test_prediction_simple(client):
+    reponse = client.post('/api/predire', json={'date': '2025-02-10'})
+    assert reponse.status_code == 200
+    prediction = reponse.get_json()
+    assert prediction['Total'] == sum(prediction[r] for r in ['Petit_Dejeuner', 'Dejeuner', 'Diner'])
+    assert prediction['Calendrier']['jour_semaine'] == 2
+
+
+def test_intervalles_ordonnes(client):
+    reponse = client.post('/api/predire', json={'date_debut': '2025-02-01', 'date_fin': '2025-02-28',
+                                                'intervalles': True, 'quantiles': [0.1, 0.9]})
+    assert reponse.status_code == 200
+    for prevision in reponse.get_json()['previsions']:
+        intervalles = prevision['Intervalles']
+        assert intervalles['quantiles'] == [0.1, 0.9]
+        for serie in ['Petit_Dejeuner', 'Dejeuner', 'Diner', 'Total']:
+            assert 0 <= intervalles[serie]['bas'] <= intervalles[serie]['haut']
+
+
+def test_intervalles_plus_larges_avec_quantiles_extremes(client):
+    def largeur(quantiles):
+        reponse = client.post('/api/predire', json={'date': '2025-02-10', 'intervalles': True,
+                                                    'quantiles': quantiles})
+        intervalle = reponse.get_json()['Intervalles']['Total']
+        return intervalle['haut'] - intervalle['bas']
+
+    assert largeur([0.05, 0.95]) >= largeur([0.25, 0.75])
+
+
+def test_moyenne_des_arbres_egale_predict(app_web):
+    X = app_web.calendrier.plage('2025-02-01', '2025-02-28')[app_web.features]
+    for model in app_web.models.values():
+        np.testing.assert_allclose(app_web.predictions_par_arbre(model, X).mean(axis=0),
+                                   model.predict(X), rtol=1e-6)
+
+
+@pytest.mark.parametrize('quantiles', [[0.9, 0.1], [0.5], [-0.1, 0.5], [0.5, 1.5], [0.5, 0.5]])
+def test_quantiles_invalides(client, quantiles):
+    reponse = client.post('/api/predire', json={'date': '2025-02-10', 'intervalles': True,
+                                                'quantiles': quantiles})
+    assert reponse.status_code == 400
+    assert 'quantiles' in reponse.get_json()['error']
+
+
+def lire_ndjson(reponse):
+    assert reponse.mimetype == 'application/x-ndjson'
+    texte = reponse.get_data(as_text=True)
+    assert texte.endswith('\n')
+    return [json.loads(ligne) for ligne in texte.splitlines()]
+
+
+def test_flux_ndjson_un_jour_par_ligne(app_web, client):
+    # Plus d'un bloc de calcul, pour vérifier les jonctions entre blocs
+    fin = pd.Timestamp('2025-01-01') + pd.Timedelta(days=app_web.TAILLE_BLOC_FLUX + 9)
+    reponse = client.post('/api/predire', json={'date_debut': '2025-01-01',
+                                                'date_fin': fin.strftime('%Y-%m-%d'),
+                                                'format': 'ndjson'})
+    lignes = lire_ndjson(reponse)
+    assert len(lignes) == app_web.TAILLE_BLOC_FLUX + 10
+    assert [ligne['Date'] for ligne in lignes] == \
+        [jour.strftime('%Y-%m-%d') for jour in pd.date_range('2025-01-01', fin)]
+
+
+def test_flux_ndjson_erreur_dans_le_flux(app_web, client, monkeypatch):
+    predire_table = app_web.predire_table
+    appels = []
+
+    def predire_puis_echouer(table, data, quantiles=None):
+        appels.append(len(table))
+        if len(appels) > 1:
+            raise RuntimeError('panne du modèle')
+        return predire_table(table, data, quantiles)
+
+    monkeypatch.setattr(app_web, 'predire_table', predire_puis_echouer)
+    reponse = client.post('/api/predire', json={'date_debut': '2025-01-01', 'date_fin': '2025-12-31'},
+                          headers={'Accept': 'application/x-ndjson'})
+    assert reponse.status_code == 200
+    lignes = lire_ndjson(reponse)
+    assert len(lignes) == app_web.TAILLE_BLOC_FLUX + 1
+    assert lignes[-1] == {'error': 'panne du modèle'}
+
+
+def test_variantes_indexees_par_jour(app_web):
+    table = app_web.calendrier.plage('2025-02-09', '2025-02-15')
+    variantes = app_web.predire_variantes(table, {})
+    assert len(variantes) == len(table)
+
+    for nom, forces in app_web.VARIANTES.items():
+        attendues = app_web.predire_lignes(table[app_web.features].assign(**forces))
+        assert [variantes_jour[nom] for variantes_jour in variantes] == attendues
+
+
+def test_stock_lecture_a_travers(app_web, client):
+    avant = dict(app_web.stock.statistiques)
+    corps = {'date_debut': '2031-03-01', 'date_fin': '2031-03-07'}
+    premiere = client.post('/api/predire', json=corps).get_json()
+    seconde = client.post('/api/predire', json=corps).get_json()
+    assert premiere == seconde
+    assert app_web.stock.statistiques['echecs'] - avant['echecs'] == 7
+    assert app_web.stock.statistiques['succes'] - avant['succes'] == 7
+
+
+def test_page_etag_et_304(client):
+    reponse = client.get('/systeme-prediction-restaurant', headers={'Accept-Encoding': 'gzip'})
+    assert reponse.status_code == 200
+    assert reponse.headers['Content-Encoding'] == 'gzip'
+    conditionnelle = client.get('/systeme-prediction-restaurant',
+                               headers={'Accept-Encoding': 'gzip',
+                                        'If-None-Match': reponse.headers['ETag']})
+    assert conditionnelle.status_code == 304
+
+
+def test_frequentation_sans_base(app_web, client, monkeypatch):
+    monkeypatch.setattr(app_web, 'stock', None)
+    reponse = client.post('/api/frequentation', json={'date': '2025-02-10', 'Petit_Dejeuner': 1,
+                                                      'Dejeuner': 2, 'Diner': 3})
+    assert reponse.status_code == 404
+
+
+def test_frequentation_exige_le_jeton(app_web, client):
+    corps = {'date': '2025-02-10', 'Petit_Dejeuner': 400, 'Dejeuner': 1300, 'Diner': 900}
+    assert client.post('/api/frequentation', json=corps).status_code == 403
+    assert client.post('/api/frequentation', json=corps,
+                       headers={'X-Ingestion': 'mauvais'}).status_code == 403
+    assert app_web.stock.lire_reel() == []
+
+    reponse = client.post('/api/frequentation', json=corps, headers={'X-Ingestion': 'jeton-saisie'})
+    assert reponse.status_code == 200
+    assert [date for date, _ in app_web.stock.lire_reel()] == ['2025-02-10']
+
+
+def test_profilage_exige_le_jeton(app_web, client):
+    assert client.post('/api/profilage', json={'taux': 0.5}).status_code == 403
+    assert 'X-Profilage' not in client.post('/api/predire', json={'date': '2025-02-10'},
+                                            headers={'X-Profilage': '1'}).headers
+
+    # Jeton dans l'URL : ignoré
+    assert 'X-Profilage' not in client.post('/api/predire?profilage=jeton-test',
+                                            json={'date': '2025-02-10'}).headers
+
+    reponse = client.post('/api/predire', json={'date': '2025-02-10'},
+                          headers={'X-Profilage': 'jeton-test'})
+    assert 'X-Profilage' in reponse.headers
+    assert app_web.app.config['PROFILAGE_TAUX'] == 0
+
+
+def test_metriques_prometheus(client):
+    client.post('/api/predire', json={'date': '2025-02-10'})
+    texte = client.get('/metrics').get_data(as_text=True)
+    assert 'http_requete_duree_secondes_count{route="/api/predire"}' in texte
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from calendrier import COLONNES, CalendrierIndex, construire_calendrier, construire_features
+
+
+def test_jour_semaine_dimanche_vaut_1():
+    # Du dimanche 9 au samedi 15 février 2025
+    table = construire_features(pd.date_range('2025-02-09', '2025-02-15'), [])
+    assert table['Jour_Semaine'].tolist() == [1, 2, 3, 4, 5, 6, 7]
+
+
+def test_weekend_vendredi_samedi():
+    table = construire_features(pd.date_range('2025-02-09', '2025-02-15'), [])
+    # Dimanche ... Samedi : seuls Vendredi et Samedi sont le weekend
+    assert table['Weekend'].tolist() == [0, 0, 0, 0, 0, 1, 1]
+
+
+def test_features_de_l_annee():
+    table = construire_features([pd.Timestamp('2025-02-10')], [])
+    ligne = table.iloc[0]
+    assert (ligne['Jour_Annee'], ligne['Trimestre'], ligne['Semaine_Annee']) == (41, 1, 7)
+
+
+def test_jours_feries_fixes_et_du_csv():
+    index = CalendrierIndex.charger()
+    assert index.infos('2025-11-01')['Jour_Ferie'] == 1
+    assert index.infos('2024-04-10')['Jour_Ferie'] == 1
+    assert index.infos('2025-02-10')['Jour_Ferie'] == 0
+
+
+def test_index_identique_au_calcul_hors_plage():
+    index = CalendrierIndex.charger()
+    dates = pd.date_range('2025-08-25', '2025-09-20')
+    attendue = construire_calendrier(dates, index.periodes)
+    obtenue = index.plage(dates[0], dates[-1])
+    np.testing.assert_array_equal(obtenue[COLONNES].to_numpy(), attendue[COLONNES].to_numpy())
+    assert obtenue['Libelle'].tolist() == attendue['Libelle'].tolist()
+
+
+def test_statistiques_de_l_index():
+    index = CalendrierIndex.charger()
+    index.features(['2025-02-10'])
+    index.features(['1990-01-01'])
+    assert index.statistiques == {'succes': 1, 'echecs': 1}
@@ -0,0 +1,77 @@
+import gzip
+
+import pytest
+from flask import Flask, jsonify, request
+
+from compression_http import PageStatique, compresser_reponse
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    page = PageStatique('<html>' + 'restaurant ' * 500 + '</html>', max_age=60)
+
+    @app.route('/')
+    def accueil():
+        return page.reponse(request)
+
+    @app.route('/donnees/<int:n>')
+    def donnees(n):
+        return jsonify({'valeurs': list(range(n))})
+
+    app.after_request(lambda reponse: compresser_reponse(reponse, request))
+    return app.test_client()
+
+
+def test_page_etag_et_304(client):
+    reponse = client.get('/')
+    assert reponse.status_code == 200
+    etag = reponse.headers['ETag']
+    assert reponse.headers['Cache-Control'] == 'public, max-age=60'
+
+    conditionnelle = client.get('/', headers={'If-None-Match': etag})
+    assert conditionnelle.status_code == 304
+    assert conditionnelle.data == b''
+
+
+def test_page_gzip_negociee(client):
+    compressee = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert compressee.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressee.headers['Vary']
+
+    brute = client.get('/', headers={'Accept-Encoding': 'identity'})
+    assert 'Content-Encoding' not in brute.headers
+    assert gzip.decompress(compressee.data) == brute.data
+
+
+def test_page_etag_propre_a_chaque_encodage(client):
+    compressee = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    brute = client.get('/', headers={'Accept-Encoding': 'identity'})
+    assert compressee.headers['ETag'] != brute.headers['ETag']
+    assert not compressee.headers['ETag'].startswith('W/')
+
+    # L'ETag de la variante gzip ne revalide pas la variante non compressée
+    assert client.get('/', headers={'Accept-Encoding': 'identity',
+                                    'If-None-Match': compressee.headers['ETag']}).status_code == 200
+    assert client.get('/', headers={'Accept-Encoding': 'gzip',
+                                    'If-None-Match': compressee.headers['ETag']}).status_code == 304
+
+
+def test_petite_reponse_json_non_compressee(client):
+    reponse = client.get('/donnees/3', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in reponse.headers
+
+
+def test_grande_reponse_json_compressee_et_conditionnelle(client):
+    reponse = client.get('/donnees/2000', headers={'Accept-Encoding': 'gzip'})
+    assert reponse.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(reponse.data).startswith(b'{"valeurs":[0,1,2')
+
+    assert reponse.headers['ETag'].endswith('-gzip"')
+
+    conditionnelle = client.get('/donnees/2000', headers={'Accept-Encoding': 'gzip',
+                                                         'If-None-Match': reponse.headers['ETag']})
+    assert conditionnelle.status_code == 304
+    brute = client.get('/donnees/2000', headers={'If-None-Match': reponse.headers['ETag']})
+    assert brute.status_code == 200
+    assert 'Content-Encoding' not in brute.headers
@@ -0,0 +1,32 @@
+import json
+
+import train_model
+from estimateurs import ESTIMATEURS
+
+
+def test_pipeline_complet(dossier_modeles):
+    dossier = dossier_modeles['dossier']
+    for fichier in ['model_Petit_Dejeuner.pkl', 'model_Dejeuner.pkl', 'model_Diner.pkl',
+                    'model_Total.pkl', 'features_list.txt', 'metriques_modeles.csv',
+                    'rapport_evaluation.json', 'reference_surveillance.json']:
+        assert (dossier / fichier).exists(), fichier
+
+    rapport = json.loads((dossier / 'rapport_evaluation.json').read_text(encoding='utf-8'))
+    for cible in train_model.CIBLES:
+        assert rapport['repas'][cible]['selection']['estimateur'] in ESTIMATEURS
+    assert set(rapport['reconciliation']['mae_test']) == set(train_model.CIBLES)
+    assert set(dossier_modeles['durees_etapes']) >= {'chargement', 'entrainement', 'sauvegarde'}
+
+
+def test_reference_sans_valeurs_manquantes(dossier_modeles):
+    reference = json.loads((dossier_modeles['dossier'] / 'reference_surveillance.json')
+                           .read_text(encoding='utf-8'))
+    for colonne, distribution in reference['distributions'].items():
+        assert all(borne == borne for borne in distribution['bornes']), colonne
+        assert abs(sum(distribution['proportions']) - 1) < 1e-9
+
+
+def test_predire(dossier_modeles):
+    prediction = train_model.predire(dossier_modeles['models'], jour=10, mois=2, annee=2025)
+    assert set(prediction) == {'Petit_Dejeuner', 'Dejeuner', 'Diner', 'Total'}
+    assert prediction['Total'] == sum(prediction[repas] for repas in train_model.REPAS)
@@ -0,0 +1,24 @@
+from metriques import Registre
+
+
+def test_bornes_des_buckets_inclusives():
+    registre = Registre()
+    histogramme = registre.histogramme('duree', 'Durée.', buckets=(0.1, 1.0))
+    for valeur in (0.1, 0.5, 1.0, 2.0):
+        histogramme.observer(valeur)
+
+    lignes = dict(ligne.rsplit(' ', 1) for ligne in registre.exposer().splitlines()
+                  if not ligne.startswith('#'))
+    # Une observation égale à une borne compte dans ce bucket (le = « <= »)
+    assert lignes['duree_bucket{le="0.1"}'] == '1'
+    assert lignes['duree_bucket{le="1.0"}'] == '3'
+    assert lignes['duree_bucket{le="+Inf"}'] == '4'
+    assert lignes['duree_count'] == '4'
+    assert float(lignes['duree_sum']) == 3.6
+
+
+def test_labels_echappes():
+    registre = Registre()
+    compteur = registre.compteur('erreurs_total', 'Erreurs.', labels=('type',))
+    compteur.inc(type='a"b\\c\nd')
+    assert 'erreurs_total{type="a\\"b\\\\c\\nd"} 1' in registre.exposer().splitlines()
@@ -0,0 +1,83 @@
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestRegressor
+
+import modele_compact
+from calendrier import FEATURES
+from modele_compact import ForetCompacte, charger_foret_compacte, chemin_compact
+
+
+@pytest.fixture(scope='module')
+def foret_et_donnees():
+    generateur = np.random.default_rng(0)
+    X = pd.DataFrame(generateur.integers(1, 13, size=(400, 3)), columns=['a', 'b', 'c'])
+    y = 100 * X['a'] + 20 * X['b'] + generateur.normal(0, 30, len(X)) + 500
+    foret = RandomForestRegressor(n_estimators=20, max_depth=10, random_state=0).fit(X, y)
+    return foret, X
+
+
+@pytest.mark.parametrize('precision, tolerance', [('float32', 1e-3), ('float16', 1.0)])
+def test_ecart_avec_la_foret_d_origine(foret_et_donnees, precision, tolerance):
+    foret, X = foret_et_donnees
+    compacte = ForetCompacte.depuis_foret(foret, precision)
+    assert np.abs(compacte.predict(X) - foret.predict(X)).max() <= tolerance
+
+
+def test_predictions_par_arbre(foret_et_donnees):
+    foret, X = foret_et_donnees
+    compacte = ForetCompacte.depuis_foret(foret, 'float32')
+    attendues = np.stack([arbre.predict(X.to_numpy(dtype=np.float32)) for arbre in foret.estimators_])
+    np.testing.assert_allclose(compacte.predict_arbres(X), attendues, atol=1e-3)
+
+
+def test_sauvegarde_et_chargement(foret_et_donnees, tmp_path):
+    foret, X = foret_et_donnees
+    compacte = ForetCompacte.depuis_foret(foret)
+    chemin = tmp_path / 'model.npz'
+    compacte.sauvegarder(chemin)
+    rechargee = charger_foret_compacte(chemin)
+    assert rechargee.features == ['a', 'b', 'c']
+    np.testing.assert_array_equal(rechargee.predict(X), compacte.predict(X))
+
+
+@pytest.fixture
+def dossier_forets(tmp_path):
+    generateur = np.random.default_rng(0)
+    X = pd.DataFrame(generateur.integers(1, 13, size=(200, len(FEATURES))), columns=FEATURES)
+    for graine, repas in enumerate(modele_compact.REPAS):
+        foret = RandomForestRegressor(n_estimators=5, random_state=graine)
+        joblib.dump(foret.fit(X, 100 * X['Mois'] + generateur.normal(0, 10, len(X))),
+                    tmp_path / f'model_{repas}.pkl')
+    (tmp_path / 'features_list.txt').write_text(','.join(FEATURES))
+    return tmp_path
+
+
+def exporter(dossier, monkeypatch, *options):
+    monkeypatch.setattr(sys, 'argv', ['modele_compact.py', '--modeles', str(dossier), *options])
+    modele_compact.main()
+
+
+def test_export_conserve_dans_la_tolerance(dossier_forets, monkeypatch):
+    exporter(dossier_forets, monkeypatch, '--precision', 'float32')
+    chemin_pkl = str(dossier_forets / 'model_Diner.pkl')
+    assert chemin_compact(chemin_pkl) == str(dossier_forets / 'model_Diner.npz')
+    assert not list(dossier_forets.glob('*.tmp.npz'))
+
+
+def test_export_hors_tolerance_supprime(dossier_forets, monkeypatch):
+    exporter(dossier_forets, monkeypatch, '--precision', 'float32')
+    with pytest.raises(SystemExit):
+        exporter(dossier_forets, monkeypatch, '--tolerance', '-1')
+    assert not list(dossier_forets.glob('*.npz'))
+
+
+def test_export_perime_ignore(dossier_forets, monkeypatch):
+    exporter(dossier_forets, monkeypatch, '--precision', 'float32')
+    chemin_pkl = dossier_forets / 'model_Diner.pkl'
+    # Réentraînement : le .pkl change, l'ancien .npz ne doit plus être servi
+    joblib.dump(joblib.load(chemin_pkl).set_params(n_estimators=6), chemin_pkl)
+    assert chemin_compact(str(chemin_pkl)) is None
@@ -0,0 +1,28 @@
+import numpy as np
+
+from reconciliation import REPAS, reconcilier
+
+
+def test_repas_somment_au_total():
+    previsions = {'Total': np.array([2000.0, 900.0]),
+                  'Petit_Dejeuner': np.array([400.0, 100.0]),
+                  'Dejeuner': np.array([900.0, 500.0]),
+                  'Diner': np.array([600.0, 200.0])}
+    reconciliees = reconcilier(previsions)
+    np.testing.assert_allclose(sum(reconciliees[repas] for repas in REPAS), reconciliees['Total'])
+
+
+def test_ecart_reparti_a_parts_egales():
+    # Somme des repas 1900, Total 2000 : écart de 100 réparti sur les 4 séries
+    reconciliees = reconcilier({'Total': [2000.0], 'Petit_Dejeuner': [400.0],
+                                'Dejeuner': [900.0], 'Diner': [600.0]})
+    np.testing.assert_allclose(reconciliees['Total'], [1975.0])
+    np.testing.assert_allclose(reconciliees['Dejeuner'], [925.0])
+
+
+def test_previsions_coherentes_inchangees():
+    previsions = {'Total': [1900.0], 'Petit_Dejeuner': [400.0], 'Dejeuner': [900.0],
+                  'Diner': [600.0]}
+    reconciliees = reconcilier(previsions)
+    for serie, valeurs in previsions.items():
+        np.testing.assert_allclose(reconciliees[serie], valeurs)
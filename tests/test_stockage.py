@@ -0,0 +1,74 @@
+import pytest
+
+from stockage import StockPrevisions, empreinte_fichiers
+
+DATES = ['2025-02-10', '2025-02-11', '2025-02-12']
+
+
+def ligne(valeur):
+    return {'Petit_Dejeuner': valeur, 'Dejeuner': 2 * valeur, 'Diner': 3 * valeur,
+            'Total': 6 * valeur}
+
+
+class Calcul:
+    """Fonction ``calculer`` qui mémorise les positions demandées."""
+
+    def __init__(self, valeur):
+        self.valeur = valeur
+        self.appels = []
+
+    def __call__(self, positions):
+        self.appels.append(list(positions))
+        return [ligne(self.valeur + i) for i in positions]
+
+
+@pytest.fixture
+def stock(tmp_path):
+    return StockPrevisions(str(tmp_path / 'previsions.db'))
+
+
+def test_lecture_a_travers_la_base(stock):
+    calcul = Calcul(100)
+    premieres = stock.lire_ou_calculer('principal', 'v1', DATES[:2], calcul)
+    assert calcul.appels == [[0, 1]]
+
+    # Seule la date absente est calculée ; les autres sont relues
+    toutes = stock.lire_ou_calculer('principal', 'v1', DATES, calcul)
+    assert calcul.appels == [[0, 1], [2]]
+    assert toutes[:2] == premieres
+    assert toutes[2] == ligne(102)
+    assert stock.statistiques == {'succes': 2, 'echecs': 3}
+
+
+def test_nouvelle_version_recalculee(stock):
+    stock.lire_ou_calculer('principal', 'v1', DATES, Calcul(100))
+    calcul = Calcul(200)
+    lignes = stock.lire_ou_calculer('principal', 'v2', DATES, calcul)
+    assert calcul.appels == [[0, 1, 2]]
+    assert lignes[0] == ligne(200)
+
+
+def test_sites_separes(stock):
+    stock.lire_ou_calculer('principal', 'v1', DATES, Calcul(100))
+    calcul = Calcul(300)
+    stock.lire_ou_calculer('annexe', 'v1', DATES, calcul)
+    assert calcul.appels == [[0, 1, 2]]
+
+
+def test_empreinte_change_avec_le_fichier(tmp_path):
+    modele, calendrier = tmp_path / 'model.pkl', tmp_path / 'calendrier.csv'
+    modele.write_bytes(b'modele')
+    calendrier.write_text('Debut,Fin,Type,Libelle\n')
+    version = empreinte_fichiers([modele, calendrier])
+    assert version == empreinte_fichiers([modele, calendrier])
+    calendrier.write_text('Debut,Fin,Type,Libelle\n01/01/2026,02/01/2026,vacances,Hiver\n')
+    assert empreinte_fichiers([modele, calendrier]) != version
+
+
+def test_comparaison_et_frequentation_reelle(stock):
+    stock.enregistrer('principal', 'v1', [(DATES[0], ligne(100))])
+    stock.enregistrer_reel('principal', [(DATES[0], ligne(90)), (DATES[1], ligne(95))])
+    comparaison = stock.comparer(DATES[0], DATES[-1])
+    assert len(comparaison) == 1
+    assert comparaison[0]['erreur']['Total'] == 60
+    assert [date for date, _ in stock.lire_reel()] == DATES[:2]
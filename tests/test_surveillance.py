@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import surveillance as module_surveillance
+from surveillance import (DistributionGlissante, MAEGlissante, Reentrainement, Surveillance,
+                          construire_reference)
+
+
+@pytest.fixture
+def reference():
+    generateur = np.random.default_rng(0)
+    return construire_reference(pd.DataFrame({'Dejeuner': generateur.normal(1000, 100, 2000)}),
+                                ['Dejeuner'])
+
+
+def distribution_apres(reference, valeurs):
+    distribution = DistributionGlissante(**reference['Dejeuner'], demi_vie=10 ** 6)
+    for valeur in valeurs:
+        distribution.ajouter(valeur)
+    return distribution
+
+
+def test_psi_stable_sans_derive(reference):
+    valeurs = np.random.default_rng(1).normal(1000, 100, 2000)
+    assert distribution_apres(reference, valeurs).psi() < 0.05
+
+
+def test_psi_d_un_decalage_connu(reference):
+    # Décalage d'un écart-type : PSI nettement au-delà du seuil de dérive
+    valeurs = np.random.default_rng(1).normal(1100, 100, 2000)
+    assert distribution_apres(reference, valeurs).psi() > 0.25
+
+
+def test_reference_refuse_les_valeurs_manquantes():
+    with pytest.raises(ValueError, match='Dejeuner'):
+        construire_reference(pd.DataFrame({'Dejeuner': [1.0, np.nan, 3.0]}), ['Dejeuner'])
+
+
+def test_mae_glissante():
+    mae = MAEGlissante(fenetre=3)
+    for erreur in (10, -20, 30, -40):
+        mae.ajouter(erreur)
+    assert len(mae) == 3
+    assert mae.valeur == pytest.approx(30)
+
+
+def test_alerte_mae():
+    surveillance = Surveillance({'mae_test': {'Dejeuner': 10}}, min_observations=3)
+    reel = {'Petit_Dejeuner': 100, 'Dejeuner': 100, 'Diner': 100}
+    prevision = {'Petit_Dejeuner': 100, 'Dejeuner': 150, 'Diner': 100}
+    alertes = []
+    for jour in range(3):
+        alertes = surveillance.observer(f'2025-02-1{jour}', {}, reel, prevision)
+    assert alertes == ['MAE Dejeuner 50.0 > 15.0']
+
+
+def test_derive_rapportee_sans_alerte(reference):
+    # Période de vacances : fréquentation constante, très loin de la référence
+    surveillance = Surveillance({'distributions': reference}, min_observations=14)
+    for jour in range(19):
+        surveillance.observer(f'2025-07-{jour + 1:02d}', {}, {'Dejeuner': 50})
+    assert surveillance.alertes() == []
+    assert surveillance.etat()['derives'][0].startswith('PSI Dejeuner')
+
+
+class ProcessusFactice:
+    lances = []
+
+    def __init__(self, *args, **kwargs):
+        ProcessusFactice.lances.append(args)
+
+    def poll(self):
+        return None
+
+
+@pytest.fixture
+def reentrainement(tmp_path, monkeypatch):
+    ProcessusFactice.lances = []
+    monkeypatch.setattr(module_surveillance.subprocess, 'Popen', ProcessusFactice)
+    return lambda: Reentrainement('base.db', journal=str(tmp_path / 'journal.log'),
+                                  fichier_etat=str(tmp_path / 'etat.json'))
+
+
+def test_un_seul_lancement_concurrent(reentrainement):
+    instance = reentrainement()
+    resultats = []
+    threads = [threading.Thread(target=lambda: resultats.append(instance.declencher('test')))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert resultats.count(True) == 1
+    assert len(ProcessusFactice.lances) == 1
+
+
+def test_delai_conserve_apres_redemarrage(reentrainement, tmp_path):
+    assert reentrainement().declencher('premier')
+    # Nouvelle instance (application redémarrée) : le délai minimal court toujours
+    assert not reentrainement().declencher('second')
+    assert json.loads((tmp_path / 'etat.json').read_text())['dernier_lancement'] <= time.time()
+    assert len(ProcessusFactice.lances) == 1
+
+
+def test_reprise_sans_reentrainement(reentrainement):
+    instance = reentrainement()
+    surveillance = Surveillance({'mae_test': {'Dejeuner': 10}}, min_observations=1,
+                                reentrainement=instance)
+    reel = {'Petit_Dejeuner': 100, 'Dejeuner': 100, 'Diner': 100}
+    prevision = {'Petit_Dejeuner': 100, 'Dejeuner': 200, 'Diner': 100}
+    assert surveillance.observer('2025-02-10', {}, reel, prevision, reentrainer=False)
+    assert ProcessusFactice.lances == []
+    surveillance.observer('2025-02-11', {}, reel, prevision)
+    assert len(ProcessusFactice.lances) == 1
@@ -5,298 +5,468 @@ SYSTÈME COMPLET DE PRÉDICTION - RESTAURANT UNIVERSITAIRE
 
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 import matplotlib.pyplot as plt
 import seaborn as sns
 import joblib
+from joblib import Parallel, delayed
+import argparse
+import json
+import os
+import time
 from datetime import datetime
 import warnings
 
+from estimateurs import ESTIMATEURS, BUDGET_LATENCE_MS, selectionner
+from calendrier import CalendrierIndex, construire_features
+from reconciliation import reconcilier
+from stockage import StockPrevisions, SITE_DEFAUT
+from surveillance import construire_reference
+
 warnings.filterwarnings('ignore')
 
 # Configuration
 sns.set_style('whitegrid')
 plt.rcParams['figure.figsize'] = (15, 10)
 
-print("=" * 80)
-print(" SYSTÈME DE PRÉDICTION ML - RESTAURANT UNIVERSITAIRE")
-print("=" * 80)
+REPAS = ['Petit_Dejeuner', 'Dejeuner', 'Diner']
+# Le Total a aussi son propre modèle, pour la réconciliation (reconciliation.py)
+CIBLES = REPAS + ['Total']
 
-# ============================================================================
-# ÉTAPE 1 : CHARGEMENT DES DONNÉES COMPLÈTES
-# ============================================================================
+features = ['Jour_Semaine', 'Mois', 'Annee', 'Jour_Ferie', 'Weekend',
+            'Jour_Annee', 'Trimestre', 'Semaine_Annee']
 
-print("\n📂 ÉTAPE 1 : Chargement des données...")
+# Modèles candidats (voir estimateurs.py) : le plus précis en validation parmi
+# ceux qui prédisent un jour en moins de BUDGET_LATENCE_MS est retenu
+CANDIDATS = list(ESTIMATEURS)
 
-try:
-    df = pd.read_csv('Data base (csv).csv')
-    print(f"✅ Données chargées : {len(df)} lignes")
 
-    # RENOMMER LES COLONNES
-    print("\n🔧 Renommage des colonnes...")
-    df.columns = df.columns.str.strip()  # Enlever espaces
+# ============================================================================
+# ÉTAPE 1 : CHARGEMENT DES DONNÉES COMPLÈTES
+# ============================================================================
 
-    df = df.rename(columns={
-        'Jours de la semane': 'Jour_Semaine',
-        'Année': 'Annee',
-        'jour de Ferié': 'Jour_Ferie',
-        'les étudiants arrivent au Petit Déjeuner': 'Petit_Dejeuner',
-        'les étudiants arrivent au Déjeuner': 'Dejeuner',
-        'les étudiants arrivent au dinner': 'Diner'
+def charger_donnees(chemin='Data base (csv).csv'):
+    print("\n📂 ÉTAPE 1 : Chargement des données...")
+
+    try:
+        df = pd.read_csv(chemin)
+        print(f"✅ Données chargées : {len(df)} lignes")
+
+        # RENOMMER LES COLONNES
+        print("\n🔧 Renommage des colonnes...")
+        df.columns = df.columns.str.strip()  # Enlever espaces
+
+        df = df.rename(columns={
+            'Jours de la semane': 'Jour_Semaine',
+            'Année': 'Annee',
+            'jour de Ferié': 'Jour_Ferie',
+            'les étudiants arrivent au Petit Déjeuner': 'Petit_Dejeuner',
+            'les étudiants arrivent au Déjeuner': 'Dejeuner',
+            'les étudiants arrivent au dinner': 'Diner'
+        })
+
+        print("✅ Colonnes renommées avec succès !")
+        print(f"Colonnes actuelles : {df.columns.tolist()}")
+
+    except FileNotFoundError:
+        print("❌ ERREUR : Fichier 'Data_base.csv' non trouvé !")
+        exit()
+
+    # Vérifier les colonnes
+    colonnes_requises = ['Jour_Semaine', 'Mois', 'Annee', 'Jour_Ferie', 'Weekend',
+                         'Petit_Dejeuner', 'Dejeuner', 'Diner']
+
+    if not all(col in df.columns for col in colonnes_requises):
+        print("❌ Colonnes manquantes !")
+        print(f"Colonnes trouvées : {df.columns.tolist()}")
+        print(f"Colonnes requises : {colonnes_requises}")
+        exit()
+
+    return df
+
+
+def ajouter_frequentation_reelle(df, base, site=SITE_DEFAUT):
+    """Complète le dataset avec la fréquentation réelle saisie via l'API
+    (base des prévisions), pour les jours absents du CSV."""
+    connues = set(pd.to_datetime(df['Date'], format='%d/%m/%Y', errors='coerce')
+                  .dt.strftime('%Y-%m-%d').dropna())
+    nouvelles = [(date, ligne) for date, ligne in StockPrevisions(base).lire_reel(site)
+                 if date not in connues]
+    if not nouvelles:
+        print(f"ℹ️  Aucune fréquentation réelle supplémentaire dans {base}")
+        return df
+
+    table = CalendrierIndex.charger().features([date for date, _ in nouvelles])
+    reels = pd.DataFrame([ligne for _, ligne in nouvelles])
+    ajout = pd.DataFrame({
+        'Date': table.index.strftime('%d/%m/%Y'),
+        **{colonne: table[colonne].to_numpy()
+           for colonne in ['Jour_Semaine', 'Mois', 'Annee', 'Jour_Ferie', 'Weekend']},
+        **{colonne: reels[colonne].to_numpy() for colonne in CIBLES}
     })
+    print(f"✅ {len(ajout)} jours de fréquentation réelle ajoutés depuis {base}")
+    return pd.concat([df, ajout], ignore_index=True)
 
-    print("✅ Colonnes renommées avec succès !")
-    print(f"Colonnes actuelles : {df.columns.tolist()}")
-
-except FileNotFoundError:
-    print("❌ ERREUR : Fichier 'Data_base.csv' non trouvé !")
-    exit()
-
-# Vérifier les colonnes
-colonnes_requises = ['Jour_Semaine', 'Mois', 'Annee', 'Jour_Ferie', 'Weekend',
-                     'Petit_Dejeuner', 'Dejeuner', 'Diner']
-
-if not all(col in df.columns for col in colonnes_requises):
-    print("❌ Colonnes manquantes !")
-    print(f"Colonnes trouvées : {df.columns.tolist()}")
-    print(f"Colonnes requises : {colonnes_requises}")
-    exit()
 
 # ============================================================================
 # ÉTAPE 2 : PRÉPARATION ET ANALYSE DES DONNÉES
 # ============================================================================
 
-print("\n📊 ÉTAPE 2 : Analyse des données...")
-
-# Créer des features supplémentaires
-if 'Date' in df.columns:
-    df['Date'] = pd.to_datetime(df['Date'], format='%d/%m/%Y', errors='coerce')
-    df['Jour_Annee'] = df['Date'].dt.dayofyear
-    df['Trimestre'] = df['Date'].dt.quarter
-    df['Semaine_Annee'] = df['Date'].dt.isocalendar().week
-else:
-    df['Jour_Annee'] = (df['Mois'] - 1) * 30 + 15
-    df['Trimestre'] = ((df['Mois'] - 1) // 3) + 1
-    df['Semaine_Annee'] = df['Mois'] * 4
-
-# Statistiques descriptives
-print("\n📈 Statistiques globales :")
-print("-" * 80)
-stats = df[['Petit_Dejeuner', 'Dejeuner', 'Diner', 'Total']].describe()
-print(stats)
-
-# Analyser par type de jour
-print("\n📊 Moyennes par type de jour :")
-print("-" * 80)
-print(f"Semaine  : {df[df['Weekend'] == 0]['Total'].mean():.0f} étudiants/jour")
-print(f"Weekend  : {df[df['Weekend'] == 1]['Total'].mean():.0f} étudiants/jour")
-if df['Jour_Ferie'].sum() > 0:
-    print(f"Férié    : {df[df['Jour_Ferie'] == 1]['Total'].mean():.0f} étudiants/jour")
+def analyser_donnees(df):
+    print("\n📊 ÉTAPE 2 : Analyse des données...")
+
+    # Créer des features supplémentaires
+    if 'Date' in df.columns:
+        df['Date'] = pd.to_datetime(df['Date'], format='%d/%m/%Y', errors='coerce')
+        df['Jour_Annee'] = df['Date'].dt.dayofyear
+        df['Trimestre'] = df['Date'].dt.quarter
+        df['Semaine_Annee'] = df['Date'].dt.isocalendar().week
+    else:
+        df['Jour_Annee'] = (df['Mois'] - 1) * 30 + 15
+        df['Trimestre'] = ((df['Mois'] - 1) // 3) + 1
+        df['Semaine_Annee'] = df['Mois'] * 4
+
+    # Statistiques descriptives
+    print("\n📈 Statistiques globales :")
+    print("-" * 80)
+    stats = df[['Petit_Dejeuner', 'Dejeuner', 'Diner', 'Total']].describe()
+    print(stats)
+
+    # Analyser par type de jour
+    print("\n📊 Moyennes par type de jour :")
+    print("-" * 80)
+    print(f"Semaine  : {df[df['Weekend'] == 0]['Total'].mean():.0f} étudiants/jour")
+    print(f"Weekend  : {df[df['Weekend'] == 1]['Total'].mean():.0f} étudiants/jour")
+    if df['Jour_Ferie'].sum() > 0:
+        print(f"Férié    : {df[df['Jour_Ferie'] == 1]['Total'].mean():.0f} étudiants/jour")
+
+    return df
+
 
 # ============================================================================
 # ÉTAPE 3 : PRÉPARATION DES FEATURES
 # ============================================================================
 
-print("\n🔧 ÉTAPE 3 : Préparation des features...")
+def preparer_features(df):
+    print("\n🔧 ÉTAPE 3 : Préparation des features...")
 
-features = ['Jour_Semaine', 'Mois', 'Annee', 'Jour_Ferie', 'Weekend',
-            'Jour_Annee', 'Trimestre', 'Semaine_Annee']
+    # Filtrer les lignes valides : la ligne de synthèse finale du CSV
+    # ('Total,,,,...') n'a ni date ni features
+    df_clean = df[df['Total'] > 0].dropna(subset=features).copy()
+    if 'Date' in df_clean.columns:
+        df_clean = df_clean.dropna(subset=['Date'])
+    df_clean[features] = df_clean[features].astype(int)
+    print(f"✅ Données nettoyées : {len(df_clean)} jours valides")
+
+    return df_clean
 
-# Filtrer les lignes valides
-df_clean = df[df['Total'] > 0].copy()
-print(f"✅ Données nettoyées : {len(df_clean)} jours valides")
 
 # ============================================================================
 # ÉTAPE 4 : ENTRAÎNEMENT DES MODÈLES
 # ============================================================================
 
-print("\n🤖 ÉTAPE 4 : Entraînement des modèles Random Forest...")
-print("-" * 80)
-
-models = {}
-metrics = {}
-predictions_test = {}
-
-for target in ['Petit_Dejeuner', 'Dejeuner', 'Diner']:
-    print(f"\n🔹 Entraînement : {target}")
+def entrainer_modeles(df_clean, candidats=CANDIDATS, budget_latence_ms=BUDGET_LATENCE_MS):
+    print("\n🤖 ÉTAPE 4 : Sélection et entraînement des modèles...")
+    print("-" * 80)
 
     X = df_clean[features]
-    y = df_clean[target]
 
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, shuffle=True
+    # Même découpage train/test pour les trois repas, et une part du train
+    # réservée à la sélection du modèle
+    positions_train, positions_test = train_test_split(
+        np.arange(len(df_clean)), test_size=0.2, random_state=42, shuffle=True
     )
+    separation = {'train': positions_train, 'test': positions_test}
+    sous_train, validation = train_test_split(positions_train, test_size=0.2, random_state=42)
+
+    models = {}
+    cv_mae = {}
+    selection = {}
+
+    for target in CIBLES:
+        print(f"\n🔹 Entraînement : {target}")
+
+        y = df_clean[target]
+
+        choisi, residus, candidats_evalues = selectionner(
+            X.iloc[sous_train], y.iloc[sous_train], X.iloc[validation], y.iloc[validation],
+            candidats, budget_latence_ms
+        )
+        for nom, resultat in candidats_evalues.items():
+            marque = "👉" if nom == choisi else "  "
+            budget = "" if resultat['dans_budget'] else " (hors budget)"
+            print(f"   {marque} {nom:<9}: MAE validation {resultat['mae_validation']:.2f} | "
+                  f"{resultat['latence_ms']:.2f} ms/jour{budget}")
+
+        model = ESTIMATEURS[choisi]()
+        model.fit(X.iloc[positions_train], y.iloc[positions_train])
+        # Résidus de validation : intervalles de prédiction des modèles sans arbres
+        model.residus_validation_ = residus
+
+        cv_scores = cross_val_score(model, X, y, cv=5,
+                                    scoring='neg_mean_absolute_error')
+        cv_mae[target] = -cv_scores.mean()
+        print(f"   CV MAE (5-fold): {cv_mae[target]:.2f} étudiants")
+
+        models[target] = model
+        selection[target] = {'estimateur': choisi, 'candidats': candidats_evalues}
 
-    model = RandomForestRegressor(
-        n_estimators=200,
-        max_depth=20,
-        min_samples_split=3,
-        min_samples_leaf=2,
-        max_features='sqrt',
-        random_state=42,
-        n_jobs=-1,
-        bootstrap=True
+    return models, separation, cv_mae, selection
+
+
+# ============================================================================
+# ÉTAPE 5 : ÉVALUATION DES MODÈLES
+# ============================================================================
+
+def importance_permutation(model, X_test, y_test, y_pred_test, repetitions=5, graine=42):
+    """Hausse de la MAE de test quand chaque feature est permutée.
+
+    Toutes les copies permutées sont prédites en un seul appel ; la MAE de
+    référence réutilise les prédictions de test déjà calculées.
+    """
+    generateur = np.random.default_rng(graine)
+    n_lignes, n_features = X_test.shape
+    copies = []
+    for colonne in range(n_features):
+        for _ in range(repetitions):
+            copie = X_test.copy()
+            copie[:, colonne] = copie[generateur.permutation(n_lignes), colonne]
+            copies.append(copie)
+
+    y_pred = model.predict(pd.DataFrame(np.concatenate(copies), columns=features))
+    mae = np.abs(y_pred.reshape(n_features, repetitions, n_lignes) - y_test).mean(axis=2)
+    hausses = mae - np.abs(y_pred_test - y_test).mean()
+    return {'moyenne': hausses.mean(axis=1), 'ecart_type': hausses.std(axis=1)}
+
+
+def evaluer_modeles(models, df_clean, separation, cv_mae, selection, repetitions=5):
+    """Métriques train/test de tous les repas à partir d'une seule passe de
+    prédiction par modèle, puis importance des features par permutation
+    (les trois repas en parallèle)."""
+    print("\n🔎 ÉTAPE 5 : Évaluation des modèles...")
+    print("-" * 80)
+
+    X = df_clean[features]
+    Y = df_clean[CIBLES].to_numpy(dtype=float)
+    Y_pred = np.column_stack([models[target].predict(X) for target in CIBLES])
+    erreurs = Y_pred - Y
+
+    scores = {}
+    for split, positions in separation.items():
+        e, y = erreurs[positions], Y[positions]
+        scores[split] = {
+            'mae': np.abs(e).mean(axis=0),
+            'rmse': np.sqrt((e ** 2).mean(axis=0)),
+            'r2': 1 - (e ** 2).sum(axis=0) / ((y - y.mean(axis=0)) ** 2).sum(axis=0)
+        }
+
+    test = separation['test']
+    X_test = X.to_numpy(dtype=float)[test]
+    importances = Parallel(n_jobs=len(CIBLES), prefer='threads')(
+        delayed(importance_permutation)(models[target], X_test, Y[test, i], Y_pred[test, i],
+                                        repetitions)
+        for i, target in enumerate(CIBLES)
     )
 
-    model.fit(X_train, y_train)
-
-    y_pred_train = model.predict(X_train)
-    y_pred_test = model.predict(X_test)
-
-    mae_train = mean_absolute_error(y_train, y_pred_train)
-    mae_test = mean_absolute_error(y_test, y_pred_test)
-    rmse_test = np.sqrt(mean_squared_error(y_test, y_pred_test))
-    r2_train = r2_score(y_train, y_pred_train)
-    r2_test = r2_score(y_test, y_pred_test)
-
-    cv_scores = cross_val_score(model, X, y, cv=5,
-                                scoring='neg_mean_absolute_error')
-    cv_mae = -cv_scores.mean()
-
-    print(f"   MAE Train      : {mae_train:.2f} étudiants")
-    print(f"   MAE Test       : {mae_test:.2f} étudiants")
-    print(f"   RMSE Test      : {rmse_test:.2f} étudiants")
-    print(f"   R² Train       : {r2_train:.3f}")
-    print(f"   R² Test        : {r2_test:.3f}")
-    print(f"   CV MAE (5-fold): {cv_mae:.2f} étudiants")
-
-    models[target] = model
-    metrics[target] = {
-        'mae_train': mae_train,
-        'mae_test': mae_test,
-        'rmse_test': rmse_test,
-        'r2_train': r2_train,
-        'r2_test': r2_test,
-        'cv_mae': cv_mae,
-        'y_test': y_test,
-        'y_pred_test': y_pred_test
+    metrics = {}
+    predictions_test = {}
+    rapport = {
+        'genere_le': datetime.now().isoformat(timespec='seconds'),
+        'jours_train': len(separation['train']),
+        'jours_test': len(test),
+        'repetitions_permutation': repetitions,
+        'repas': {}
     }
-    predictions_test[target] = (y_test, y_pred_test)
+    for i, target in enumerate(CIBLES):
+        y_test = df_clean[target].iloc[test]
+        y_pred_test = Y_pred[test, i]
+
+        print(f"\n🔹 {target} ({selection[target]['estimateur']})")
+        print(f"   MAE Train      : {scores['train']['mae'][i]:.2f} étudiants")
+        print(f"   MAE Test       : {scores['test']['mae'][i]:.2f} étudiants")
+        print(f"   RMSE Test      : {scores['test']['rmse'][i]:.2f} étudiants")
+        print(f"   R² Train       : {scores['train']['r2'][i]:.3f}")
+        print(f"   R² Test        : {scores['test']['r2'][i]:.3f}")
+
+        metrics[target] = {
+            'mae_train': scores['train']['mae'][i],
+            'mae_test': scores['test']['mae'][i],
+            'rmse_test': scores['test']['rmse'][i],
+            'r2_train': scores['train']['r2'][i],
+            'r2_test': scores['test']['r2'][i],
+            'cv_mae': cv_mae[target],
+            'estimateur': selection[target]['estimateur'],
+            'importance_permutation': importances[i],
+            'y_test': y_test,
+            'y_pred_test': y_pred_test
+        }
+        predictions_test[target] = (y_test, y_pred_test)
+
+        rapport['repas'][target] = {
+            **{split: {nom: float(valeurs[i]) for nom, valeurs in scores[split].items()}
+               for split in scores},
+            'cv_mae': float(cv_mae[target]),
+            'selection': selection[target],
+            'importance_permutation': {
+                feature: {'moyenne': float(moyenne), 'ecart_type': float(ecart)}
+                for feature, moyenne, ecart in zip(features, importances[i]['moyenne'],
+                                                   importances[i]['ecart_type'])
+            }
+        }
+        if hasattr(models[target], 'feature_importances_'):
+            rapport['repas'][target]['importance_impurete'] = dict(
+                zip(features, models[target].feature_importances_.tolist()))
+
+    # Réconciliation hiérarchique des prévisions de test (Total = somme des repas)
+    reconciliees = reconcilier({target: Y_pred[test, i] for i, target in enumerate(CIBLES)})
+    mae_reconciliee = {target: float(np.abs(reconciliees[target] - Y[test, i]).mean())
+                       for i, target in enumerate(CIBLES)}
+    rapport['reconciliation'] = {'mae_test': mae_reconciliee}
+    print("\n🔗 MAE Test après réconciliation :")
+    for target in CIBLES:
+        print(f"   {target:<15}: {metrics[target]['mae_test']:.2f} → "
+              f"{mae_reconciliee[target]:.2f} étudiants")
+
+    return metrics, predictions_test, rapport
+
 
 # ============================================================================
-# ÉTAPE 5 : VISUALISATIONS
+# ÉTAPE 6 : VISUALISATIONS
 # ============================================================================
 
-print("\n📊 ÉTAPE 5 : Génération des graphiques...")
-
-fig, axes = plt.subplots(2, 3, figsize=(18, 12))
-fig.suptitle('Performance des Modèles de Prédiction', fontsize=16, fontweight='bold')
-
-for idx, target in enumerate(['Petit_Dejeuner', 'Dejeuner', 'Diner']):
-    y_test, y_pred = predictions_test[target]
-
-    ax1 = axes[0, idx]
-    ax1.scatter(y_test, y_pred, alpha=0.6, s=50)
-    ax1.plot([y_test.min(), y_test.max()],
-             [y_test.min(), y_test.max()],
-             'r--', lw=2, label='Prédiction parfaite')
-    ax1.set_xlabel('Valeurs Réelles', fontsize=10)
-    ax1.set_ylabel('Prédictions', fontsize=10)
-    ax1.set_title(f'{target}\nMAE: {metrics[target]["mae_test"]:.1f} | R²: {metrics[target]["r2_test"]:.3f}')
-    ax1.legend()
-    ax1.grid(True, alpha=0.3)
-
-    ax2 = axes[1, idx]
-    errors = y_pred - y_test.values
-    ax2.hist(errors, bins=30, edgecolor='black', alpha=0.7)
-    ax2.axvline(0, color='red', linestyle='--', linewidth=2)
-    ax2.set_xlabel('Erreur de prédiction', fontsize=10)
-    ax2.set_ylabel('Fréquence', fontsize=10)
-    ax2.set_title(f'Distribution des erreurs\nMoyenne: {errors.mean():.1f} | Std: {errors.std():.1f}')
-    ax2.grid(True, alpha=0.3)
-
-plt.tight_layout()
-plt.savefig('performance_modeles.png', dpi=300, bbox_inches='tight')
-print("✅ Graphique sauvegardé : performance_modeles.png")
-
-fig, axes = plt.subplots(1, 3, figsize=(18, 5))
-fig.suptitle('Importance des Variables (Features)', fontsize=16, fontweight='bold')
-
-for idx, target in enumerate(['Petit_Dejeuner', 'Dejeuner', 'Diner']):
-    model = models[target]
-    importances = pd.DataFrame({
-        'Feature': features,
-        'Importance': model.feature_importances_
-    }).sort_values('Importance', ascending=False)
-
-    axes[idx].barh(importances['Feature'], importances['Importance'])
-    axes[idx].set_xlabel('Importance', fontsize=10)
-    axes[idx].set_title(target, fontsize=12)
-    axes[idx].grid(True, alpha=0.3, axis='x')
-
-plt.tight_layout()
-plt.savefig('importance_features.png', dpi=300, bbox_inches='tight')
-print("✅ Graphique sauvegardé : importance_features.png")
-
-if 'Date' in df_clean.columns:
-    fig, ax = plt.subplots(figsize=(18, 6))
-    df_sorted = df_clean.sort_values('Date')
-
-    ax.plot(df_sorted['Date'], df_sorted['Petit_Dejeuner'],
-            label='Petit Déjeuner', marker='o', markersize=2, alpha=0.7)
-    ax.plot(df_sorted['Date'], df_sorted['Dejeuner'],
-            label='Déjeuner', marker='s', markersize=2, alpha=0.7)
-    ax.plot(df_sorted['Date'], df_sorted['Diner'],
-            label='Dîner', marker='^', markersize=2, alpha=0.7)
-
-    ax.set_xlabel('Date', fontsize=12)
-    ax.set_ylabel('Nombre d\'étudiants', fontsize=12)
-    ax.set_title('Évolution de la Fréquentation dans le Temps',
-                 fontsize=14, fontweight='bold')
-    ax.legend(fontsize=10)
-    ax.grid(True, alpha=0.3)
-    plt.xticks(rotation=45)
+def generer_graphiques(df_clean, models, metrics, predictions_test, dossier='.'):
+    print("\n📊 ÉTAPE 6 : Génération des graphiques...")
+
+    fig, axes = plt.subplots(2, 3, figsize=(18, 12))
+    fig.suptitle('Performance des Modèles de Prédiction', fontsize=16, fontweight='bold')
+
+    for idx, target in enumerate(REPAS):
+        y_test, y_pred = predictions_test[target]
+
+        ax1 = axes[0, idx]
+        ax1.scatter(y_test, y_pred, alpha=0.6, s=50)
+        ax1.plot([y_test.min(), y_test.max()],
+                 [y_test.min(), y_test.max()],
+                 'r--', lw=2, label='Prédiction parfaite')
+        ax1.set_xlabel('Valeurs Réelles', fontsize=10)
+        ax1.set_ylabel('Prédictions', fontsize=10)
+        ax1.set_title(f'{target}\nMAE: {metrics[target]["mae_test"]:.1f} | R²: {metrics[target]["r2_test"]:.3f}')
+        ax1.legend()
+        ax1.grid(True, alpha=0.3)
+
+        ax2 = axes[1, idx]
+        errors = y_pred - y_test.values
+        ax2.hist(errors, bins=30, edgecolor='black', alpha=0.7)
+        ax2.axvline(0, color='red', linestyle='--', linewidth=2)
+        ax2.set_xlabel('Erreur de prédiction', fontsize=10)
+        ax2.set_ylabel('Fréquence', fontsize=10)
+        ax2.set_title(f'Distribution des erreurs\nMoyenne: {errors.mean():.1f} | Std: {errors.std():.1f}')
+        ax2.grid(True, alpha=0.3)
 
     plt.tight_layout()
-    plt.savefig('evolution_temporelle.png', dpi=300, bbox_inches='tight')
-    print("✅ Graphique sauvegardé : evolution_temporelle.png")
+    plt.savefig(os.path.join(dossier, 'performance_modeles.png'), dpi=300, bbox_inches='tight')
+    print("✅ Graphique sauvegardé : performance_modeles.png")
+
+    fig, axes = plt.subplots(1, 3, figsize=(18, 5))
+    fig.suptitle('Importance des Variables (Permutation)', fontsize=16, fontweight='bold')
+
+    for idx, target in enumerate(REPAS):
+        importance = metrics[target]['importance_permutation']
+        importances = pd.DataFrame({
+            'Feature': features,
+            'Importance': importance['moyenne'],
+            'Ecart': importance['ecart_type']
+        }).sort_values('Importance', ascending=True)
+
+        axes[idx].barh(importances['Feature'], importances['Importance'],
+                       xerr=importances['Ecart'])
+        axes[idx].set_xlabel('Hausse de la MAE test (étudiants)', fontsize=10)
+        axes[idx].set_title(target, fontsize=12)
+        axes[idx].grid(True, alpha=0.3, axis='x')
 
-# ============================================================================
-# ÉTAPE 6 : SAUVEGARDE DES MODÈLES
-# ============================================================================
+    plt.tight_layout()
+    plt.savefig(os.path.join(dossier, 'importance_features.png'), dpi=300, bbox_inches='tight')
+    print("✅ Graphique sauvegardé : importance_features.png")
+
+    if 'Date' in df_clean.columns:
+        fig, ax = plt.subplots(figsize=(18, 6))
+        df_sorted = df_clean.sort_values('Date')
+
+        ax.plot(df_sorted['Date'], df_sorted['Petit_Dejeuner'],
+                label='Petit Déjeuner', marker='o', markersize=2, alpha=0.7)
+        ax.plot(df_sorted['Date'], df_sorted['Dejeuner'],
+                label='Déjeuner', marker='s', markersize=2, alpha=0.7)
+        ax.plot(df_sorted['Date'], df_sorted['Diner'],
+                label='Dîner', marker='^', markersize=2, alpha=0.7)
 
-print("\n💾 ÉTAPE 6 : Sauvegarde des modèles...")
+        ax.set_xlabel('Date', fontsize=12)
+        ax.set_ylabel('Nombre d\'étudiants', fontsize=12)
+        ax.set_title('Évolution de la Fréquentation dans le Temps',
+                     fontsize=14, fontweight='bold')
+        ax.legend(fontsize=10)
+        ax.grid(True, alpha=0.3)
+        plt.xticks(rotation=45)
 
-for target, model in models.items():
-    filename = f'model_{target}.pkl'
-    joblib.dump(model, filename)
-    print(f"✅ Modèle sauvegardé : {filename}")
+        plt.tight_layout()
+        plt.savefig(os.path.join(dossier, 'evolution_temporelle.png'), dpi=300, bbox_inches='tight')
+        print("✅ Graphique sauvegardé : evolution_temporelle.png")
 
-metrics_df = pd.DataFrame({
-    'Repas': ['Petit_Dejeuner', 'Dejeuner', 'Diner'],
-    'MAE_Test': [metrics[t]['mae_test'] for t in ['Petit_Dejeuner', 'Dejeuner', 'Diner']],
-    'R2_Test': [metrics[t]['r2_test'] for t in ['Petit_Dejeuner', 'Dejeuner', 'Diner']],
-    'CV_MAE': [metrics[t]['cv_mae'] for t in ['Petit_Dejeuner', 'Dejeuner', 'Diner']]
-})
-metrics_df.to_csv('metriques_modeles.csv', index=False)
-print("✅ Métriques sauvegardées : metriques_modeles.csv")
+    plt.close('all')
 
-with open('features_list.txt', 'w') as f:
-    f.write(','.join(features))
-print("✅ Liste des features sauvegardée : features_list.txt")
 
 # ============================================================================
-# ÉTAPE 7 : FONCTION DE PRÉDICTION
+# ÉTAPE 7 : SAUVEGARDE DES MODÈLES
 # ============================================================================
 
-print("\n🎯 ÉTAPE 7 : Test de la fonction de prédiction...")
+def sauvegarder_modeles(models, metrics, rapport, df_clean, dossier='.'):
+    print("\n💾 ÉTAPE 7 : Sauvegarde des modèles...")
 
+    for target, model in models.items():
+        filename = f'model_{target}.pkl'
+        joblib.dump(model, os.path.join(dossier, filename))
+        print(f"✅ Modèle sauvegardé : {filename}")
+
+    metrics_df = pd.DataFrame({
+        'Repas': CIBLES,
+        'Estimateur': [metrics[t]['estimateur'] for t in CIBLES],
+        'MAE_Test': [metrics[t]['mae_test'] for t in CIBLES],
+        'R2_Test': [metrics[t]['r2_test'] for t in CIBLES],
+        'CV_MAE': [metrics[t]['cv_mae'] for t in CIBLES]
+    })
+    metrics_df.to_csv(os.path.join(dossier, 'metriques_modeles.csv'), index=False)
+    print("✅ Métriques sauvegardées : metriques_modeles.csv")
+
+    with open(os.path.join(dossier, 'rapport_evaluation.json'), 'w', encoding='utf-8') as f:
+        json.dump(rapport, f, indent=2, ensure_ascii=False)
+    print("✅ Rapport d'évaluation sauvegardé : rapport_evaluation.json")
+
+    with open(os.path.join(dossier, 'features_list.txt'), 'w') as f:
+        f.write(','.join(features))
+    print("✅ Liste des features sauvegardée : features_list.txt")
+
+    # Référence de la surveillance en ligne (surveillance.py)
+    reference = {
+        'distributions': construire_reference(df_clean, features + REPAS),
+        'mae_test': {t: float(metrics[t]['mae_test']) for t in REPAS}
+    }
+    with open(os.path.join(dossier, 'reference_surveillance.json'), 'w', encoding='utf-8') as f:
+        json.dump(reference, f, indent=2)
+    print("✅ Référence de surveillance sauvegardée : reference_surveillance.json")
 
-def predire(jour_semaine, jour, mois, annee, weekend=0, jour_ferie=0):
-    jour_annee = (mois - 1) * 30 + jour
-    trimestre = (mois - 1) // 3 + 1
-    semaine_annee = mois * 4
 
-    X_new = pd.DataFrame([[
-        jour_semaine, mois, annee, jour_ferie, weekend,
-        jour_annee, trimestre, semaine_annee
-    ]], columns=features)
+# ============================================================================
+# ÉTAPE 8 : FONCTION DE PRÉDICTION
+# ============================================================================
+
+def predire(models, jour, mois, annee, jour_ferie=0):
+    # Mêmes features que l'application (jour de la semaine, weekend, jour et
+    # semaine de l'année calculés depuis la date)
+    date = pd.Timestamp(annee, mois, jour)
+    X_new = construire_features([date], [date] if jour_ferie else [])[features]
 
     predictions = {}
-    for target, model in models.items():
-        pred = max(0, int(model.predict(X_new)[0]))
+    for target in REPAS:
+        pred = max(0, int(models[target].predict(X_new)[0]))
         predictions[target] = pred
 
     predictions['Total'] = sum(predictions.values())
@@ -304,43 +474,102 @@ def predire(jour_semaine, jour, mois, annee, weekend=0, jour_ferie=0):
     return predictions
 
 
-print("\n📝 Test : Lundi 10 Février 2025")
-test_pred = predire(jour_semaine=1, jour=10, mois=2, annee=2025, weekend=0, jour_ferie=0)
-print(f"   Petit Déjeuner : {test_pred['Petit_Dejeuner']} étudiants")
-print(f"   Déjeuner       : {test_pred['Dejeuner']} étudiants")
-print(f"   Dîner          : {test_pred['Diner']} étudiants")
-print(f"   TOTAL          : {test_pred['Total']} étudiants")
+def tester_prediction(models):
+    print("\n🎯 ÉTAPE 8 : Test de la fonction de prédiction...")
+
+    print("\n📝 Test : Lundi 10 Février 2025")
+    test_pred = predire(models, jour=10, mois=2, annee=2025, jour_ferie=0)
+    print(f"   Petit Déjeuner : {test_pred['Petit_Dejeuner']} étudiants")
+    print(f"   Déjeuner       : {test_pred['Dejeuner']} étudiants")
+    print(f"   Dîner          : {test_pred['Diner']} étudiants")
+    print(f"   TOTAL          : {test_pred['Total']} étudiants")
+
 
 # ============================================================================
 # RÉSUMÉ FINAL
 # ============================================================================
 
-print("\n" + "=" * 80)
-print("✅ ENTRAÎNEMENT TERMINÉ AVEC SUCCÈS !")
-print("=" * 80)
-
-print("\n📊 RÉSUMÉ DES PERFORMANCES :")
-print("-" * 80)
-for target in ['Petit_Dejeuner', 'Dejeuner', 'Diner']:
-    print(f"\n{target} :")
-    print(f"  • Erreur moyenne (MAE)  : ±{metrics[target]['mae_test']:.1f} étudiants")
-    print(f"  • Précision (R²)        : {metrics[target]['r2_test'] * 100:.1f}%")
-    print(f"  • Validation croisée    : ±{metrics[target]['cv_mae']:.1f} étudiants")
-
-print("\n📁 FICHIERS GÉNÉRÉS :")
-print("-" * 80)
-print("  ✅ model_Petit_Dejeuner.pkl")
-print("  ✅ model_Dejeuner.pkl")
-print("  ✅ model_Diner.pkl")
-print("  ✅ metriques_modeles.csv")
-print("  ✅ features_list.txt")
-print("  ✅ performance_modeles.png")
-print("  ✅ importance_features.png")
-print("  ✅ evolution_temporelle.png")
-
-print("\n🚀 PROCHAINE ÉTAPE :")
-print("-" * 80)
-print("  Lancez l'application web avec : python app_web.py")
-
-
-print("\n" + "=" * 80)
+def afficher_resume(metrics, durees_etapes):
+    print("\n" + "=" * 80)
+    print("✅ ENTRAÎNEMENT TERMINÉ AVEC SUCCÈS !")
+    print("=" * 80)
+
+    print("\n📊 RÉSUMÉ DES PERFORMANCES :")
+    print("-" * 80)
+    for target in CIBLES:
+        print(f"\n{target} ({metrics[target]['estimateur']}) :")
+        print(f"  • Erreur moyenne (MAE)  : ±{metrics[target]['mae_test']:.1f} étudiants")
+        print(f"  • Précision (R²)        : {metrics[target]['r2_test'] * 100:.1f}%")
+        print(f"  • Validation croisée    : ±{metrics[target]['cv_mae']:.1f} étudiants")
+
+    print("\n⏱️  DURÉE DES ÉTAPES :")
+    print("-" * 80)
+    for etape, duree in durees_etapes.items():
+        print(f"  • {etape:<22}: {duree:.2f} s")
+
+    print("\n📁 FICHIERS GÉNÉRÉS :")
+    print("-" * 80)
+    print("  ✅ model_Petit_Dejeuner.pkl")
+    print("  ✅ model_Dejeuner.pkl")
+    print("  ✅ model_Diner.pkl")
+    print("  ✅ model_Total.pkl")
+    print("  ✅ metriques_modeles.csv")
+    print("  ✅ rapport_evaluation.json")
+    print("  ✅ features_list.txt")
+    print("  ✅ reference_surveillance.json")
+    print("  ✅ performance_modeles.png")
+    print("  ✅ importance_features.png")
+    print("  ✅ evolution_temporelle.png")
+
+    print("\n🚀 PROCHAINE ÉTAPE :")
+    print("-" * 80)
+    print("  Lancez l'application web avec : python app_web.py")
+
+    print("\n" + "=" * 80)
+
+
+def executer_pipeline(chemin='Data base (csv).csv', dossier='.', base=None, site=SITE_DEFAUT):
+    """Exécute toutes les étapes d'entraînement et mesure la durée de chacune.
+
+    Avec ``base``, le CSV est complété par la fréquentation réelle stockée.
+
+    Renvoie les modèles, leurs métriques et un dictionnaire
+    ``{étape: durée en secondes}``.
+    """
+    durees_etapes = {}
+
+    def chronometrer(etape, fonction, *args, **kwargs):
+        debut = time.perf_counter()
+        resultat = fonction(*args, **kwargs)
+        durees_etapes[etape] = time.perf_counter() - debut
+        return resultat
+
+    df = chronometrer('chargement', charger_donnees, chemin)
+    if base:
+        df = chronometrer('frequentation_reelle', ajouter_frequentation_reelle, df, base, site)
+    df = chronometrer('analyse', analyser_donnees, df)
+    df_clean = chronometrer('features', preparer_features, df)
+    models, separation, cv_mae, selection = chronometrer('entrainement', entrainer_modeles,
+                                                         df_clean)
+    metrics, predictions_test, rapport = chronometrer('evaluation', evaluer_modeles, models,
+                                                      df_clean, separation, cv_mae, selection)
+    chronometrer('graphiques', generer_graphiques,
+                 df_clean, models, metrics, predictions_test, dossier)
+    chronometrer('sauvegarde', sauvegarder_modeles, models, metrics, rapport, df_clean, dossier)
+
+    return models, metrics, durees_etapes
+
+
+if __name__ == '__main__':
+    print("=" * 80)
+    print(" SYSTÈME DE PRÉDICTION ML - RESTAURANT UNIVERSITAIRE")
+    print("=" * 80)
+
+    parser = argparse.ArgumentParser(description="Entraînement des modèles")
+    parser.add_argument('--base', help="Base des prévisions : ajoute la fréquentation réelle saisie")
+    parser.add_argument('--site', default=SITE_DEFAUT)
+    args = parser.parse_args()
+
+    models, metrics, durees_etapes = executer_pipeline(base=args.base, site=args.site)
+    tester_prediction(models)
+    afficher_resume(metrics, durees_etapes)